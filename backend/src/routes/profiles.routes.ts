@@ -2,7 +2,7 @@ import { Router } from 'express'
 import mongoose from 'mongoose'
 import { z } from 'zod'
 import Profile from '../models/profile'
-import { enqueueIngest } from '../services/ingest/ingest.queue'
+import { enqueueIngest, enqueueIngestBulk } from '../services/ingest/ingest.queue'
 import { discover } from '../services/discovery/discovery.service'
 import { getProvider, ProviderName } from '../providers'
 
@@ -103,8 +103,19 @@ const IngestBody = z.object({
   handleOrUrl: z.string().min(1),
   accessToken: z.string().min(1).optional(),
 })
+const IngestBatchBody = z.object({
+  items: z.array(IngestBody).min(1).max(100),
+})
 
 profiles.post('/profiles/ingest', async (req, res) => {
+  // Batch form { items: [...] } enqueues in one round trip; results are returned in request order
+  if (Array.isArray(req.body?.items)) {
+    const batch = IngestBatchBody.safeParse(req.body)
+    if (!batch.success) return res.status(400).json({ ok: false, error: batch.error.flatten() })
+    const jobs = await enqueueIngestBulk(batch.data.items)
+    return res.json({ ok: true, results: jobs.map((job) => ({ ok: true, jobId: job.id })) })
+  }
+
   const parsed = IngestBody.safeParse(req.body)
   if (!parsed.success) return res.status(400).json({ ok: false, error: parsed.error.flatten() })
 
@@ -11,7 +11,14 @@ export function getIngestQueue() {
   return ingestQueue
 }
 
-export async function enqueueIngest(job: { provider: string; handleOrUrl?: string; accessToken?: string }) {
+type IngestJobData = { provider: string; handleOrUrl?: string; accessToken?: string }
+
+export async function enqueueIngest(job: IngestJobData) {
   const q = getIngestQueue()
   return q.add('ingest', job)
 }
+
+export async function enqueueIngestBulk(jobs: IngestJobData[]) {
+  const q = getIngestQueue()
+  return q.addBulk(jobs.map((data) => ({ name: 'ingest', data })))
+}
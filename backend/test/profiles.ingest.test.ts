@@ -0,0 +1,53 @@
+// @vitest-environment node
+import express from 'express'
+import request from 'supertest'
+import { describe, it, expect, vi, beforeEach } from 'vitest'
+
+const queue = vi.hoisted(() => ({
+  enqueueIngest: vi.fn(async () => ({ id: 'job-1' })),
+  enqueueIngestBulk: vi.fn(async (items: unknown[]) => items.map((_, i) => ({ id: `job-${i + 1}` }))),
+}))
+vi.mock('../src/services/ingest/ingest.queue', () => queue)
+
+import { profiles } from '../src/routes/profiles.routes'
+
+function app() {
+  const a = express()
+  a.use(express.json())
+  a.use('/api', profiles)
+  return a
+}
+
+describe('POST /api/profiles/ingest', () => {
+  beforeEach(() => {
+    queue.enqueueIngest.mockClear()
+    queue.enqueueIngestBulk.mockClear()
+  })
+
+  it('enqueues a single profile', async () => {
+    const res = await request(app()).post('/api/profiles/ingest').send({ provider: 'lastfm', handleOrUrl: 'rj' })
+    expect(res.status).toBe(200)
+    expect(res.body).toEqual({ ok: true, jobId: 'job-1' })
+    expect(queue.enqueueIngest).toHaveBeenCalledWith({ provider: 'lastfm', handleOrUrl: 'rj' })
+  })
+
+  it('enqueues a batch in one call and returns results in request order', async () => {
+    const items = [
+      { provider: 'lastfm', handleOrUrl: 'a' },
+      { provider: 'youtube', handleOrUrl: 'b' },
+    ]
+    const res = await request(app()).post('/api/profiles/ingest').send({ items })
+    expect(res.status).toBe(200)
+    expect(res.body).toEqual({ ok: true, results: [{ ok: true, jobId: 'job-1' }, { ok: true, jobId: 'job-2' }] })
+    expect(queue.enqueueIngestBulk).toHaveBeenCalledTimes(1)
+    expect(queue.enqueueIngestBulk).toHaveBeenCalledWith(items)
+  })
+
+  it('rejects batches over 100 items and invalid entries with 400', async () => {
+    const big = Array.from({ length: 101 }, (_, i) => ({ provider: 'lastfm', handleOrUrl: `u${i}` }))
+    expect((await request(app()).post('/api/profiles/ingest').send({ items: big })).status).toBe(400)
+    const bad = await request(app()).post('/api/profiles/ingest').send({ items: [{ provider: 'myspace', handleOrUrl: 'x' }] })
+    expect(bad.status).toBe(400)
+    expect(queue.enqueueIngestBulk).not.toHaveBeenCalled()
+  })
+})
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from social_scrapers.browser import process_tree_rss_mb
+from social_scrapers.fixtures import FixtureConfig, FixtureServer
+
+SCRAPERS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# name -> (script under tools/scrapers, arguments); {n} is the user target, {tmp} the run's scratch directory.
+# Each scenario drives one collector: spotify/playlist is selenium_scroll_collect, instagram is scroll_dialog,
+# tiktok is search_users (xhr capture) and tiktok_dom its rendered-anchor fallback with profile visits.
+SCENARIOS: Dict[str, Tuple[str, List[str]]] = {
+    "spotify": ("social_scrapers/spotify_scraper.py",
+                ["--playlist", "fixture", "--max-users", "{n}", "--ingest-delay-min-ms", "0",
+                 "--ingest-delay-max-ms", "0"]),
+    "spotify_seed": ("social_scrapers/spotify_scraper.py",
+                     ["--seed-user", "fixture", "--max-users", "{n}", "--ingest-delay-min-ms", "0",
+                      "--ingest-delay-max-ms", "0", "--checkpoint", "{tmp}/checkpoint.json"]),
+    "tiktok": ("social_scrapers/tiktok_scraper.py", ["--query", "fixture", "--max-users", "{n}"]),
+    "tiktok_dom": ("social_scrapers/tiktok_scraper.py",
+                   ["--query", "fixture", "--max-users", "{n}", "--capture", "dom"]),
+    "instagram": ("social_scrapers/instagram_scraper.py",
+                  ["--seed-user", "fixture", "--followers", "--limit", "{n}", "--cookie", "sessionid=fixture"]),
+    "facebook": ("social_scrapers/facebook_scraper.py",
+                 ["--query", "fixture", "--limit", "{n}", "--cookie", "c_user=fixture"]),
+    "youtube_web": ("social_scrapers/youtube_web_scraper.py", ["--query", "fixture", "--max-users", "{n}"]),
+    "youtube": ("social_scrapers/youtube_scraper.py",
+                ["--query", "fixture", "--max-users", "{n}", "--api-key", "fixture", "--no-cache",
+                 "--checkpoint", "{tmp}/checkpoint.json"]),
+    "lastfm": ("lastfm_scraper/lastfm_scraper.py",
+               ["--genre", "fixture", "--max-users", "{n}", "--no-cache", "--ingest-delay-min-ms", "0",
+                "--ingest-delay-max-ms", "0", "--checkpoint", "{tmp}/checkpoint.json"]),
+    "lastfm_browser": ("lastfm_scraper/lastfm_scraper.py",
+                       ["--genre", "fixture", "--max-users", "{n}", "--browser-only", "--no-cache",
+                        "--ingest-delay-min-ms", "0", "--ingest-delay-max-ms", "0"]),
+}
+# Scenarios that need no browser, for quick runs on machines without Chrome
+HTTP_SCENARIOS = ("youtube", "lastfm")
+
+
+@dataclass
+class BenchResult:
+    scenario: str
+    ok: bool
+    seconds: float
+    users: int
+    users_per_second: float
+    webdriver_calls_per_user: Optional[float]
+    http_requests: int
+    peak_rss_mb: Optional[float]
+    ingested: int
+    ingest_per_second: Optional[float]
+    error: Optional[str] = None
+
+
+class PeakMemory:
+    # Samples the RSS of a process and all its children (chromedriver, Chrome) until stopped
+    def __init__(self, pid: int, interval: float = 0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bench-rss", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = process_tree_rss_mb(self.pid)
+            if rss is not None:
+                self.peak = rss if self.peak is None else max(self.peak, rss)
+
+    def stop(self) -> Optional[float]:
+        self._stop.set()
+        self._thread.join()
+        return self.peak
+
+
+def _histogram_count(snapshot: dict, name: str) -> int:
+    return sum(s["count"] for s in snapshot.get("histograms", {}).get(name, []))
+
+
+def _count_lines(path: str) -> int:
+    try:
+        with open(path, "rb") as f:
+            return sum(1 for line in f if line.strip())
+    except OSError:
+        return 0
+
+
+def run_scenario(name: str, server: FixtureServer, max_users: int, timeout: float,
+                 pace: bool = False, extra: Optional[List[str]] = None) -> BenchResult:
+    script, template = SCENARIOS[name]
+    with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as tmp:
+        out = os.path.join(tmp, "out.jsonl")
+        metrics_path = os.path.join(tmp, "metrics.json")
+        args = [a.format(n=max_users, tmp=tmp) for a in template]
+        cmd = [sys.executable, os.path.join(SCRAPERS_DIR, script), *args, "--emit-jsonl", out,
+               "--backend", server.backend_url, "--ingest", "--no-state", "--metrics-out", metrics_path,
+               *(extra or [])]
+        env = {**os.environ, **server.env(),
+               "SCRAPER_PACE": "adaptive" if pace else "off",
+               "LASTFM_API_KEY": "fixture",
+               # Keep caches, quotas and daily caps of real runs out of the measurement
+               "SCRAPER_CACHE_PATH": os.path.join(tmp, "cache.sqlite"),
+               "SCRAPER_STATE_PATH": os.path.join(tmp, "state.sqlite"),
+               "YOUTUBE_QUOTA_PATH": os.path.join(tmp, "quota.json"),
+               "SCRAPER_PROXY_POOL": "", "SCRAPER_METRICS_OUT": ""}
+        server.fixtures.reset()
+        started = time.monotonic()
+        proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        memory = PeakMemory(proc.pid)
+        try:
+            _, stderr = proc.communicate(timeout=timeout)
+            error = None if proc.returncode == 0 else (stderr.strip().splitlines() or [f"exit {proc.returncode}"])[-1]
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            error = f"timed out after {timeout:g}s"
+        seconds = time.monotonic() - started
+        peak = memory.stop()
+        try:
+            with open(metrics_path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            snapshot = {}
+        users = _count_lines(out)
+
+    # Page loads are driver.get round trips; the rest are the instrumented execute_script/CDP calls
+    calls = _histogram_count(snapshot, "webdriver_call_seconds") + _histogram_count(snapshot, "page_load_seconds")
+    ingested, ingest_rate = server.fixtures.ingest_rate()
+    return BenchResult(
+        scenario=name,
+        ok=error is None,
+        seconds=round(seconds, 3),
+        users=users,
+        users_per_second=round(users / seconds, 2) if seconds > 0 else 0.0,
+        webdriver_calls_per_user=round(calls / users, 2) if users and calls else None,
+        http_requests=_histogram_count(snapshot, "http_request_seconds"),
+        peak_rss_mb=round(peak, 1) if peak is not None else None,
+        ingested=ingested,
+        ingest_per_second=round(ingest_rate, 1) if ingest_rate is not None else None,
+        error=error,
+    )
+
+
+def _fmt(value) -> str:
+    return "-" if value is None else f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def print_table(results: List[BenchResult]):
+    header = ("scenario", "users", "secs", "users/s", "wd calls/user", "http reqs", "peak MB", "ingested", "ingest/s")
+    rows = [(r.scenario, r.users, r.seconds, r.users_per_second, r.webdriver_calls_per_user, r.http_requests,
+             r.peak_rss_mb, r.ingested, r.ingest_per_second) for r in results]
+    cells = [header] + [tuple(_fmt(v) for v in row) for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(header))]
+    for row in cells:
+        print("  ".join(c.ljust(w) if i == 0 else c.rjust(w) for i, (c, w) in enumerate(zip(row, widths))))
+    for r in results:
+        if r.error:
+            print(f"{r.scenario} failed: {r.error}", file=sys.stderr)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the scrapers offline against local fixture sites")
+    ap.add_argument("--scenarios", type=str, default=",".join(SCENARIOS),
+                    help=f"Comma-separated scenarios, or 'http' for the browserless ones ({', '.join(SCENARIOS)})")
+    ap.add_argument("--max-users", type=int, default=200, help="Users each scraper is asked for")
+    ap.add_argument("--items", type=int, default=500, help="Entries in every fixture list")
+    ap.add_argument("--page-size", type=int, default=20, help="Entries per lazy-load batch, list page or API page")
+    ap.add_argument("--latency", type=float, default=0.05, help="Seconds each batch, list page or API response takes")
+    ap.add_argument("--repeat", type=int, default=1, help="Runs per scenario")
+    ap.add_argument("--timeout", type=float, default=600, help="Seconds before a scenario is killed")
+    ap.add_argument("--pace", action="store_true", help="Keep adaptive pacing on (off by default to measure raw speed)")
+    ap.add_argument("--out", type=str, help="Write every result as JSON")
+    ap.add_argument("extra", nargs=argparse.REMAINDER, help="Arguments after -- are passed to every scraper")
+    args = ap.parse_args()
+
+    names = list(HTTP_SCENARIOS) if args.scenarios == "http" else [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(2)
+    extra = args.extra[1:] if args.extra[:1] == ["--"] else args.extra
+
+    config = FixtureConfig(items=args.items, page_size=args.page_size, latency=args.latency)
+    results: List[BenchResult] = []
+    with FixtureServer(config) as server:
+        for name in names:
+            for _ in range(max(1, args.repeat)):
+                result = run_scenario(name, server, args.max_users, args.timeout, pace=args.pace, extra=extra)
+                print(f"{name}: {result.users} users in {result.seconds:g}s" + (f" ({result.error})" if result.error else ""),
+                      file=sys.stderr, flush=True)
+                results.append(result)
+
+    print_table(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"config": asdict(config), "max_users": args.max_users,
+                       "results": [asdict(r) for r in results]}, f, indent=1)
+    if not all(r.ok for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def _ext_patterns(*exts: str) -> List[str]:
+    # Network.setBlockedURLs matches the whole URL, so cover a trailing query string too
+    return [p for e in exts for p in (f"*.{e}", f"*.{e}?*")]
+
+
+# Network.setBlockedURLs patterns by category; scrapers only read anchors and a few text nodes
+CATEGORIES: Dict[str, List[str]] = {
+    "images": _ext_patterns("jpg", "jpeg", "png", "gif", "webp", "avif", "ico", "bmp", "heic"),
+    "media": _ext_patterns("mp4", "webm", "m3u8", "m4s", "mp3", "m4a", "ogg", "wav"),
+    "fonts": _ext_patterns("woff", "woff2", "ttf", "otf", "eot"),
+    "trackers": [
+        "*google-analytics.com/*", "*googletagmanager.com/*", "*doubleclick.net/*", "*googlesyndication.com/*",
+        "*adservice.google.com/*", "*scorecardresearch.com/*", "*hotjar.com/*", "*segment.io/*",
+        "*sentry.io/*", "*amplitude.com/*", "*quantserve.com/*", "*criteo.com/*",
+    ],
+}
+
+PROFILES: Dict[str, List[str]] = {
+    "off": [],
+    "media": ["images", "media", "fonts"],
+    "strict": ["images", "media", "fonts", "trackers"],
+}
+
+# Provider-specific extras: assets without a telltale extension, players and telemetry beacons
+PROVIDER_DENY: Dict[str, List[str]] = {
+    "youtube": ["*googlevideo.com/videoplayback*", "*youtube.com/api/stats/*", "*youtube.com/ptracking*",
+                "*ytimg.com/vi/*", "*yt3.ggpht.com/*"],
+    "tiktok": ["*tiktokcdn.com/*/video/*", "*mon.tiktokv.com/*", "*mcs.tiktokv.com/*"],
+    "instagram": ["*cdninstagram.com/v/*", "*fbcdn.net/v/*"],
+    "facebook": ["*fbcdn.net/v/*", "*facebook.com/ajax/bz*"],
+    "spotify": ["*i.scdn.co/image/*", "*mosaic.scdn.co/*", "*image-cdn-*.spotifycdn.com/*"],
+    "lastfm": ["*lastfm.freetls.fastly.net/i/u/*"],
+}
+# Patterns a provider needs even under a profile that would block them
+PROVIDER_ALLOW: Dict[str, List[str]] = {}
+
+# Rough transfer size of a blocked request by CDP resource type, for the bytes-saved estimate
+TYPICAL_BYTES: Dict[str, int] = {
+    "Image": 40_000, "Media": 1_000_000, "Font": 30_000, "Script": 50_000, "Stylesheet": 20_000,
+    "XHR": 2_000, "Fetch": 2_000, "Ping": 500, "Other": 5_000,
+}
+
+
+@dataclass
+class BlockProfile:
+    provider: str
+    mode: str
+    patterns: List[str] = field(default_factory=list)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.patterns)
+
+
+def build_profile(provider: str, mode: str = "media", allow: Iterable[str] = (),
+                  deny: Iterable[str] = ()) -> BlockProfile:
+    """Resolve a blocking mode plus provider and user lists into setBlockedURLs patterns.
+
+    Allow entries are category names or exact patterns removed from the result,
+    since Chrome's URL blocking has no exceptions of its own.
+    """
+    if mode not in PROFILES:
+        raise ValueError(f"Unknown resource blocking mode {mode!r} (choose from {', '.join(PROFILES)})")
+    patterns: List[str] = [p for cat in PROFILES[mode] for p in CATEGORIES[cat]]
+    if mode != "off":
+        # "all" (the multi-provider runner) takes every provider's extras; each only matches its own hosts
+        patterns += [p for prov in PROVIDER_DENY for p in PROVIDER_DENY[prov]] if provider == "all" \
+            else PROVIDER_DENY.get(provider, [])
+    patterns += list(deny)
+    allowed = set()
+    provider_allow = [p for prov in PROVIDER_ALLOW for p in PROVIDER_ALLOW[prov]] if provider == "all" \
+        else PROVIDER_ALLOW.get(provider, [])
+    for a in list(provider_allow) + list(allow):
+        allowed.update(CATEGORIES.get(a, [a]))
+    return BlockProfile(provider, mode, list(dict.fromkeys(p for p in patterns if p not in allowed)))
+
+
+class NetworkStats:
+    """Totals drained from Chrome performance logs: bytes transferred and requests blocked (thread-safe)."""
+
+    def __init__(self):
+        self.responses = 0
+        self.bytes_loaded = 0
+        self.blocked: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def bytes_saved(self) -> int:
+        # An estimate: blocked requests never report a size
+        return sum(TYPICAL_BYTES.get(t, TYPICAL_BYTES["Other"]) * n for t, n in self.blocked.items())
+
+    def record(self, events: Iterable[Dict[str, Any]]):
+        responses = loaded = 0
+        blocked: Counter = Counter()
+        for ev in events:
+            method = ev.get("method")
+            params = ev.get("params") or {}
+            if method == "Network.loadingFinished":
+                responses += 1
+                loaded += int(params.get("encodedDataLength") or 0)
+            elif method == "Network.loadingFailed" and params.get("blockedReason") == "inspector":
+                blocked[params.get("type") or "Other"] += 1
+        with self._lock:
+            self.responses += responses
+            self.bytes_loaded += loaded
+            self.blocked.update(blocked)
+
+    def summary(self) -> str:
+        return (f"{self.bytes_loaded / 1e6:.1f} MB over {self.responses} responses, "
+                f"{sum(self.blocked.values())} requests blocked (~{self.bytes_saved / 1e6:.1f} MB saved)")
+
+
+_profile: Optional[BlockProfile] = None
+_stats = NetworkStats()
+
+
+def configure_blocking(provider: str, mode: str = "media", allow: Iterable[str] = (),
+                       deny: Iterable[str] = ()) -> BlockProfile:
+    # Called once from main() before any browser starts; make_driver factories read it
+    global _profile
+    _profile = build_profile(provider, mode, allow, deny)
+    return _profile
+
+
+def get_blocking() -> Optional[BlockProfile]:
+    return _profile
+
+
+def network_stats() -> NetworkStats:
+    return _stats
+
+
+def blocking_options(options, profile: Optional[BlockProfile] = None, performance_log: bool = False):
+    # Performance logging feeds the run's network statistics (and response capture when asked for)
+    profile = profile or _profile
+    if performance_log or (profile is not None and profile.enabled):
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def apply_blocking(driver, profile: Optional[BlockProfile] = None):
+    profile = profile or _profile
+    if profile is None or not profile.enabled:
+        return driver
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": profile.patterns})
+    except Exception as e:
+        # Non-Chromium drivers have no CDP; they simply load everything
+        print(f"Resource blocking unavailable: {e}", file=sys.stderr)
+    return driver
+
+
+def read_network_events(driver) -> List[Dict[str, Any]]:
+    # Performance log entries are consumed on read; every reader counts them into the run's stats
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return []
+    events = []
+    for entry in entries:
+        try:
+            events.append(json.loads(entry["message"])["message"])
+        except (KeyError, TypeError, ValueError):
+            continue
+    _stats.record(events)
+    return events
+
+
+def drain_network_log(driver):
+    # Call once per page or before quitting so the totals are not lost with the browser
+    if _profile is not None and _profile.enabled:
+        read_network_events(driver)
+
+
+def add_blocking_arguments(ap: argparse.ArgumentParser):
+    ap.add_argument("--block-resources", type=str, choices=list(PROFILES),
+                    default=os.environ.get("SCRAPER_BLOCK_RESOURCES", "media"),
+                    help="Requests Chrome skips: off, media (images/video/fonts) or strict (+ trackers)")
+    ap.add_argument("--block-allow", action="append", default=[],
+                    help="Category or URL pattern to load anyway (repeatable)")
+    ap.add_argument("--block-deny", action="append", default=[], help="Extra URL pattern to block (repeatable)")
+
+
+def blocking_from_args(args: argparse.Namespace, provider: str) -> BlockProfile:
+    return configure_blocking(provider, args.block_resources, allow=args.block_allow, deny=args.block_deny)
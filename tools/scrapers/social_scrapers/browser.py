@@ -0,0 +1,499 @@
+import asyncio
+import base64
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from social_scrapers.blocking import drain_network_log, read_network_events
+from social_scrapers.common import remap_url
+from social_scrapers.metrics import COUNT_BUCKETS, inc, observe, timer
+from social_scrapers.pacing import SIGNAL_TEXT_CHARS, PageSignal, get_limiter, report, site_for
+from social_scrapers.pipeline import SKIP
+from social_scrapers.proxypool import get_proxy_pool, record_proxy, release_proxy
+
+
+def process_tree_rss_mb(pid: int) -> Optional[float]:
+    # Sum VmRSS over chromedriver and every Chrome child (Linux /proc only)
+    total_kb = 0
+    stack = [pid]
+    try:
+        while stack:
+            p = stack.pop()
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+            for tid in os.listdir(f"/proc/{p}/task"):
+                try:
+                    with open(f"/proc/{p}/task/{tid}/children") as f:
+                        stack.extend(int(c) for c in f.read().split())
+                except OSError:
+                    pass
+    except (OSError, ValueError):
+        return None
+    return total_kb / 1024.0
+
+
+class _PooledDriver:
+    def __init__(self, driver: WebDriver):
+        self.driver = driver
+        self.pages = 0
+
+
+class DriverPool:
+    """Keeps warm Chrome instances and leases them out one page (or list) at a time.
+
+    Each lease starts from a clean slate (cookies, storage and extra windows are
+    cleared). An instance is recycled once it has served max_pages leases or its
+    process tree grows past max_memory_mb. A lease that raises discards its driver.
+    Safe to share between threads.
+    """
+
+    def __init__(self, factory: Callable[[], WebDriver], size: int = 1, max_pages: int = 50,
+                 max_memory_mb: Optional[float] = 1500):
+        self.factory = factory
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self._idle: "queue.LifoQueue[_PooledDriver]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+
+    def _checkout(self) -> _PooledDriver:
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("DriverPool is closed")
+                if self._created < self.size:
+                    self._created += 1
+                    break
+            try:
+                return self._idle.get(timeout=1.0)
+            except queue.Empty:
+                continue
+        try:
+            return _PooledDriver(self.factory())
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _discard(self, pooled: _PooledDriver):
+        with self._lock:
+            self._created -= 1
+        try:
+            quit_driver(pooled.driver)
+        except Exception:
+            pass
+
+    def _worn_out(self, pooled: _PooledDriver) -> bool:
+        if self.max_pages and pooled.pages >= self.max_pages:
+            return True
+        # A browser whose pooled proxy is cooling down is replaced by one on a healthy proxy
+        proxy = getattr(pooled.driver, "proxy_url", None)
+        pool = get_proxy_pool()
+        if proxy and pool is not None and not pool.usable(proxy):
+            return True
+        if self.max_memory_mb:
+            service = getattr(pooled.driver, "service", None)
+            proc = getattr(service, "process", None)
+            rss = process_tree_rss_mb(proc.pid) if proc else None
+            if rss is not None and rss > self.max_memory_mb:
+                return True
+        return False
+
+    @staticmethod
+    def _reset(driver: WebDriver):
+        handles = driver.window_handles
+        for h in handles[1:]:
+            driver.switch_to.window(h)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        try:
+            driver.execute_script("try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}")
+        except Exception:
+            pass
+        driver.delete_all_cookies()
+        driver.get("about:blank")
+
+    def _release(self, pooled: _PooledDriver, healthy: bool):
+        if not healthy:
+            self._discard(pooled)
+            return
+        pooled.pages += 1
+        try:
+            drain_network_log(pooled.driver)
+            self._reset(pooled.driver)
+        except Exception:
+            self._discard(pooled)
+            return
+        if self._closed or self._worn_out(pooled):
+            self._discard(pooled)
+        else:
+            self._idle.put(pooled)
+
+    @contextmanager
+    def lease(self) -> Iterator[WebDriver]:
+        pooled = self._checkout()
+        healthy = False
+        try:
+            yield pooled.driver
+            healthy = True
+        except GeneratorExit:
+            # A collector generator closed early (limit reached); the browser itself is fine
+            healthy = True
+            raise
+        finally:
+            self._release(pooled, healthy)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(pooled)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@contextmanager
+def lease_driver(pool: Optional[DriverPool], factory: Callable[[], WebDriver]) -> Iterator[WebDriver]:
+    # Borrow from the pool when one is given, otherwise own a one-off driver for the block
+    if pool is not None:
+        with pool.lease() as driver:
+            yield driver
+        return
+    driver = factory()
+    try:
+        yield driver
+    finally:
+        quit_driver(driver)
+
+
+def quit_driver(driver: WebDriver):
+    # Record the page's network totals before the log goes away with the browser
+    drain_network_log(driver)
+    try:
+        driver.quit()
+    finally:
+        release_proxy(driver)
+
+
+class ProfileEnricher:
+    """Pipeline enrich stage that visits profile pages on pooled browsers.
+
+    `visit(driver, url)` returns the fields to merge into the candidate. Up to
+    `limit` profiles are visited (None for all), each URL at most once; results are
+    memoized so a profile seen again is filled without another page load. Run the
+    pipeline with enrich_concurrency equal to the pool size to keep every browser busy.
+    """
+
+    def __init__(self, pool: DriverPool, visit: Callable[[WebDriver, str], Dict[str, Any]],
+                 limit: Optional[int] = 10, complete: Optional[Callable[[dict], bool]] = None):
+        self.pool = pool
+        self.visit = visit
+        self.limit = limit
+        # Candidates the collector already filled in (e.g. from captured API responses) need no visit
+        self.complete = complete
+        self.visited = 0
+        # One future per URL, so concurrent workers asking for the same profile share a single visit
+        self._memo: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+    def _load(self, url: str) -> Dict[str, Any]:
+        with self.pool.lease() as driver:
+            return self.visit(driver, url)
+
+    async def enrich(self, item: dict):
+        if self.complete is not None and self.complete(item):
+            return item
+        url = item.get("profile_url")
+        if not url:
+            return SKIP
+        if url not in self._memo:
+            if self.limit is not None and self.visited >= self.limit:
+                return SKIP
+            self.visited += 1
+            self._memo[url] = asyncio.ensure_future(asyncio.to_thread(self._load, url))
+        item.update(await self._memo[url])
+        return item
+
+
+# Returns [href, text, context] for matching anchors not seen on earlier ticks and tags them, so each
+# scroll tick costs one WebDriver round trip and only ships the new results.
+_NEW_ANCHORS_JS = """
+const [selector, mark, rootSelector, withContext] = arguments;
+const root = rootSelector ? document.querySelector(rootSelector) : document;
+if (!root) return [];
+const out = [];
+for (const a of root.querySelectorAll(selector)) {
+  a.setAttribute(mark, '1');
+  let context = '';
+  if (withContext) {
+    const box = a.parentElement && a.parentElement.closest('div');
+    context = box ? (box.innerText || '').trim().split('\\n')[0] : '';
+  }
+  out.push([a.href || a.getAttribute('href') || '', (a.innerText || '').trim(), context]);
+}
+return out;
+"""
+
+
+def collect_new_anchors(driver: WebDriver, selector: str, root: Optional[str] = None, context: bool = False,
+                        mark: str = "data-ws-seen") -> List[Dict[str, str]]:
+    """Fetch {href, text} for anchors that appeared since the previous call, in one execute_script."""
+    fresh = ", ".join(f"{part.strip()}:not([{mark}])" for part in selector.split(","))
+    with timer("webdriver_call_seconds", op="collect"):
+        rows = driver.execute_script(_NEW_ANCHORS_JS, fresh, mark, root, context) or []
+    out: List[Dict[str, str]] = []
+    for href, text, ctx in rows:
+        item = {"href": href or "", "text": text or ""}
+        if context:
+            item["context"] = ctx or ""
+        out.append(item)
+    return out
+
+
+class ResponseCapture:
+    """Collects the bodies of XHR/fetch responses whose URL contains `pattern`.
+
+    Reads Chrome's performance log (the driver must be started with it enabled)
+    and fetches each matching body over CDP once its loading has finished. Call
+    poll() after each scroll tick; bodies are returned once, in arrival order.
+    """
+
+    def __init__(self, driver: WebDriver, pattern: str):
+        self.driver = driver
+        self.pattern = pattern
+        self.captured = 0
+        self._pending: Dict[str, str] = {}
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+        except Exception:
+            pass
+
+    @property
+    def pending(self) -> int:
+        # Matching responses whose headers arrived but whose body has not finished loading
+        return len(self._pending)
+
+    def poll(self) -> List[Tuple[str, str]]:
+        out: List[Tuple[str, str]] = []
+        with timer("webdriver_call_seconds", op="network_log"):
+            events = read_network_events(self.driver)
+        for ev in events:
+            method = ev.get("method")
+            params = ev.get("params") or {}
+            request_id = params.get("requestId")
+            if method == "Network.responseReceived":
+                url = (params.get("response") or {}).get("url", "")
+                if self.pattern in url:
+                    self._pending[request_id] = url
+            elif method == "Network.loadingFinished" and request_id in self._pending:
+                url = self._pending.pop(request_id)
+                try:
+                    with timer("webdriver_call_seconds", op="response_body"):
+                        res = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+                except Exception:
+                    # Evicted from the DevTools buffer or the page navigated away
+                    continue
+                body = res.get("body") or ""
+                if res.get("base64Encoded"):
+                    body = base64.b64decode(body).decode("utf-8", "replace")
+                self.captured += 1
+                out.append((url, body))
+            elif method == "Network.loadingFailed":
+                self._pending.pop(request_id, None)
+        return out
+
+
+_PAGE_SIGNAL_JS = "return [location.href, (document.body && document.body.innerText || '').slice(0, arguments[0])];"
+
+
+def check_page(driver: WebDriver, empty: bool = False) -> Optional[str]:
+    """Run the site's block detectors on the current page and feed the result to its limiter.
+
+    With empty=True a page no detector recognises still counts as a block ("empty"):
+    a results list that never rendered an entry is the quietest form of throttling.
+    A block also counts against the browser's pooled proxy.
+    """
+    try:
+        with timer("webdriver_call_seconds", op="check"):
+            url, text = driver.execute_script(_PAGE_SIGNAL_JS, SIGNAL_TEXT_CHARS)
+    except Exception:
+        return None
+    limiter = get_limiter(url)
+    if limiter is None:
+        return None
+    reason = report(limiter, PageSignal(url, text))
+    if reason is None and empty:
+        reason = "empty"
+        limiter.blocked(reason)
+    if reason:
+        record_proxy(getattr(driver, "proxy_url", None), banned=True)
+    return reason
+
+
+def load_page(driver: WebDriver, url: str) -> Optional[str]:
+    # Paced driver.get: waits for the site's slot, then checks the landing page for block signals.
+    # Load time and failures feed the health of the browser's pooled proxy and the page_load_seconds histogram.
+    limiter = get_limiter(url)
+    if limiter is not None:
+        limiter.wait()
+    proxy = getattr(driver, "proxy_url", None)
+    site = site_for(url) or "other"
+    started = time.monotonic()
+    try:
+        driver.get(remap_url(url))
+    except Exception:
+        if limiter is not None:
+            limiter.blocked("timeout")
+        record_proxy(proxy, ok=False)
+        observe("page_load_seconds", time.monotonic() - started, site=site, outcome="error")
+        raise
+    elapsed = time.monotonic() - started
+    reason = check_page(driver) if limiter is not None else None
+    if not reason:
+        record_proxy(proxy, latency=elapsed)
+    observe("page_load_seconds", elapsed, site=site, outcome=reason or "ok")
+    return reason
+
+
+# Politeness floor between scroll ticks; the waiter returns no sooner than this even when content is instant
+DEFAULT_SCROLL_JITTER = (0.2, 0.6)
+
+# Returns [anchor count, scroll height, document complete, resource entries, end marker present]
+_SCROLL_PROBE_JS = """
+const [selector, rootSelector, endSelector] = arguments;
+const root = rootSelector ? document.querySelector(rootSelector) : null;
+const scope = root || document;
+const box = root || document.scrollingElement || document.body;
+return [
+  scope.querySelectorAll(selector).length,
+  box ? box.scrollHeight : 0,
+  document.readyState === 'complete',
+  performance.getEntriesByType('resource').length,
+  !!(endSelector && document.querySelector(endSelector)),
+];
+"""
+
+
+class ScrollWaiter:
+    """Replaces the fixed sleep after each scroll with a wait for the list to grow.
+
+    scroll() returns as soon as the anchor count or scroll height grows. While the
+    page is still fetching (document loading or new resource entries) it keeps
+    polling with a growing interval up to `timeout`; once the page is idle for
+    `settle` seconds without growth the tick counts as stagnant. `done` turns True
+    after `stagnant_limit` stagnant ticks in a row or when `end_marker` matches.
+    A random `jitter` floor keeps ticks polite even when content arrives at once.
+    Each tick also takes a slot from the site's adaptive limiter; a tick that grows
+    the list counts as a healthy response, and a list that ends without ever showing
+    an entry is checked for block signals. Tick time, new results per tick and the
+    tick outcome (grew, stagnant, ended) are recorded per site.
+    """
+
+    def __init__(self, driver: WebDriver, selector: str, root: Optional[str] = None,
+                 end_marker: Optional[str] = None, jitter: Tuple[float, float] = DEFAULT_SCROLL_JITTER,
+                 stagnant_limit: int = 3, timeout: float = 6.0, settle: float = 0.75,
+                 poll: float = 0.1, max_poll: float = 0.8):
+        self.driver = driver
+        self.selector = selector
+        self.root = root
+        self.end_marker = end_marker
+        self.jitter = jitter
+        self.stagnant_limit = stagnant_limit
+        self.timeout = timeout
+        self.settle = settle
+        self.poll = poll
+        self.max_poll = max_poll
+        self.stagnant = 0
+        self.ended = False
+        self.seen_any = False
+        self._limiter = None
+        self._site: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.ended or self.stagnant >= self.stagnant_limit
+
+    def _probe(self) -> List[Any]:
+        with timer("webdriver_call_seconds", op="probe"):
+            return self.driver.execute_script(_SCROLL_PROBE_JS, self.selector, self.root, self.end_marker)
+
+    def scroll(self, script: str = "window.scrollTo(0, document.body.scrollHeight);") -> bool:
+        # True when the tick produced new content
+        if self._site is None:
+            url = self.driver.current_url
+            self._limiter = get_limiter(url)
+            self._site = site_for(url) or "other"
+        count, height, _, resources, ended = self._probe()
+        self.seen_any = self.seen_any or count > 0
+        if ended:
+            self.ended = True
+            inc("scroll_ticks_total", site=self._site, outcome="ended")
+            return False
+        if self._limiter is not None:
+            self._limiter.wait()
+        start = time.monotonic()
+        floor = start + random.uniform(*self.jitter)
+        with timer("webdriver_call_seconds", op="scroll"):
+            self.driver.execute_script(script)
+        grew = False
+        now_count = count
+        interval = self.poll
+        idle_since: Optional[float] = None
+        while True:
+            time.sleep(interval)
+            now_count, now_height, complete, now_resources, ended = self._probe()
+            now = time.monotonic()
+            if now_count > count or now_height > height:
+                grew = True
+                break
+            if ended:
+                self.ended = True
+                break
+            if now - start >= self.timeout:
+                break
+            if not complete or now_resources > resources:
+                # Still fetching: back off instead of hammering the page with probes
+                idle_since = None
+                interval = min(interval * 2, self.max_poll)
+            else:
+                idle_since = idle_since if idle_since is not None else now
+                if now - idle_since >= self.settle:
+                    break
+                interval = self.poll
+            resources = now_resources
+        remaining = floor - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        self.stagnant = 0 if grew else self.stagnant + 1
+        observe("scroll_tick_seconds", time.monotonic() - start, site=self._site)
+        observe("scroll_new_results", max(0, now_count - count), COUNT_BUCKETS, site=self._site)
+        inc("scroll_ticks_total", site=self._site,
+            outcome="grew" if grew else "ended" if self.ended else "stagnant")
+        if self._limiter is not None:
+            if grew:
+                self._limiter.success()
+            elif self.done and not self.seen_any:
+                check_page(self.driver, empty=True)
+        return grew
@@ -0,0 +1,186 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+import httpx
+import orjson
+
+from social_scrapers.metrics import inc
+
+# Seconds a stored response is served without asking the API again, by endpoint
+DEFAULT_TTLS: Dict[str, float] = {
+    "youtube:/channels": 24 * 3600,
+    "youtube:/channelSections": 7 * 24 * 3600,
+    "youtube:/search": 12 * 3600,
+    "lastfm:user.getinfo": 24 * 3600,
+    "lastfm:user.gettoptags": 7 * 24 * 3600,
+    "lastfm:user.gettopartists": 7 * 24 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "wreckshop-scrapers", "responses.sqlite")
+
+# Credentials never become part of a cache key
+SECRET_PARAMS = ("key", "api_key")
+
+
+@dataclass
+class CachedResponse:
+    key: str
+    body: bytes
+    etag: Optional[str]
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def json(self):
+        return orjson.loads(self.body)
+
+
+class ResponseCache:
+    """SQLite-backed cache for JSON API responses, shared by runs and processes.
+
+    Entries are keyed by endpoint plus normalized params and expire per endpoint
+    TTL. Expired entries with an ETag are revalidated with If-None-Match instead
+    of being refetched. Once the stored bodies exceed max_bytes the least recently
+    used entries are evicted.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttls: Optional[Mapping[str, float]] = None,
+                 default_ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, endpoint TEXT NOT NULL, body BLOB NOT NULL, etag TEXT,"
+            " size INTEGER NOT NULL, stored_at REAL NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        # Bytes stored, kept current on every write; other processes' writes are picked up by the
+        # exact recount that precedes an eviction
+        self._bytes = self._stored_bytes()
+
+    def _stored_bytes(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def ttl(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    @staticmethod
+    def make_key(endpoint: str, params: Mapping[str, object], secret: Iterable[str] = SECRET_PARAMS) -> str:
+        # Sorted, stringified params so {"a": 1, "b": "x"} and {"b": "x", "a": "1"} share an entry
+        norm = sorted((str(k), str(v)) for k, v in params.items() if k not in secret and v is not None)
+        return hashlib.sha256(orjson.dumps([endpoint, norm])).hexdigest()
+
+    def lookup(self, endpoint: str, params: Mapping[str, object]) -> Tuple[str, Optional[CachedResponse]]:
+        key = self.make_key(endpoint, params)
+        with self._lock:
+            row = self._db.execute("SELECT body, etag, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats[f"{endpoint} miss"] += 1
+                inc("cache_lookups_total", endpoint=endpoint, outcome="miss")
+                return key, None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        entry = CachedResponse(key, row[0], row[1], row[2])
+        outcome = "hit" if entry.fresh else "stale"
+        self.stats[f"{endpoint} {outcome}"] += 1
+        inc("cache_lookups_total", endpoint=endpoint, outcome=outcome)
+        return key, entry
+
+    @staticmethod
+    def validators(entry: Optional[CachedResponse]) -> Dict[str, str]:
+        # Conditional request headers for a stale entry
+        if entry is not None and entry.etag:
+            return {"If-None-Match": entry.etag}
+        return {}
+
+    def store(self, key: str, endpoint: str, body: bytes, etag: Optional[str] = None):
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, body, etag, size, stored_at, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, body, etag, len(body), now, now + self.ttl(endpoint), now),
+            )
+            self._bytes += len(body) - (old[0] if old else 0)
+            self.stats[f"{endpoint} store"] += 1
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def store_response(self, key: str, endpoint: str, resp: httpx.Response):
+        self.store(key, endpoint, resp.content, resp.headers.get("ETag"))
+
+    def revalidated(self, key: str, endpoint: str):
+        # 304: the stored body is current again for another TTL
+        with self._lock:
+            self._db.execute("UPDATE responses SET expires_at = ? WHERE key = ?", (time.time() + self.ttl(endpoint), key))
+            self.stats[f"{endpoint} revalidated"] += 1
+
+    def _evict(self):
+        # Only runs once the running total says the cache is full; recount exactly before deleting
+        self._bytes = self._stored_bytes()
+        if self._bytes <= self.max_bytes:
+            return
+        # Trim to 90% so a full cache does not evict on every store
+        target = self._bytes - int(self.max_bytes * 0.9)
+        freed = 0
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if freed >= target:
+                break
+            doomed.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self._bytes -= freed
+        self.stats["evicted"] += len(doomed)
+
+    def summary(self) -> str:
+        def count(outcome: str) -> int:
+            return sum(v for k, v in self.stats.items() if k.endswith(f" {outcome}"))
+
+        # A stale lookup ends as a hit when the API answers 304, as a miss when the body is refetched
+        revalidated = count("revalidated")
+        hits = count("hit") + revalidated
+        misses = count("miss") + max(0, count("stale") - revalidated)
+        total = hits + misses
+        rate = 100.0 * hits / total if total else 0.0
+        return f"{hits} hits, {misses} misses ({rate:.0f}% served from cache)"
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def configure_cache(path: Optional[str] = None, enabled: bool = True, **kwargs) -> Optional[ResponseCache]:
+    # Called once from main(); SCRAPER_CACHE_PATH overrides the default location
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+    if enabled:
+        _cache = ResponseCache(path or os.environ.get("SCRAPER_CACHE_PATH") or DEFAULT_CACHE_PATH, **kwargs)
+    return _cache
+
+
+def get_cache() -> Optional[ResponseCache]:
+    return _cache
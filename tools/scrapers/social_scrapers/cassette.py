@@ -0,0 +1,238 @@
+import argparse
+import asyncio
+import atexit
+import base64
+import datetime as dt
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+
+# Query parameters holding credentials: redacted on disk and ignored when matching
+SECRET_PARAMS = ("api_key", "key")
+# Request headers never written to a cassette
+SECRET_HEADERS = ("authorization", "cookie", "proxy-authorization")
+# Response headers describing the wire encoding; bodies are stored decoded
+WIRE_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive")
+
+
+def _redact(url: str) -> str:
+    parts = urlsplit(url)
+    query = [(k, "REDACTED" if k in SECRET_PARAMS else v) for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def match_key(method: str, url: str, body: bytes = b"") -> str:
+    # Method, URL with sorted query and no credentials, and a digest of any body
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in SECRET_PARAMS)
+    key = f"{method.upper()} {urlunsplit(parts._replace(query=urlencode(query), fragment=''))}"
+    if body:
+        key += " " + hashlib.sha1(body).hexdigest()
+    return key
+
+
+class Cassette:
+    """Recorded request/response pairs, kept as a gzip-compressed HAR 1.2 file.
+
+    In record mode every exchange is appended and the file is written by save().
+    In replay mode a request is answered from the first unused recording with the
+    same method, URL (credentials and parameter order ignored) and body; once a
+    request's recordings run out the last one is served again. A request with no
+    recording gets a 404 marked x-cassette: miss. `latency` delays each replayed
+    response by a fixed number of seconds, or by its recorded time with "recorded".
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency: Union[None, float, str] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.entries: List[dict] = []
+        self.stats: Counter = Counter()
+        self._index: Dict[str, List[int]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self.load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            har = json.load(f)
+        self.entries = har.get("log", {}).get("entries", [])
+        self._index.clear()
+        for i, entry in enumerate(self.entries):
+            self._index.setdefault(entry["_key"], []).append(i)
+
+    def save(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            har = {"log": {"version": "1.2", "creator": {"name": "wreckshop-scrapers", "version": "1"},
+                           "entries": list(self.entries)}}
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(har, f)
+        os.replace(tmp, self.path)
+
+    def record(self, request: httpx.Request, response: httpx.Response, content: bytes, seconds: float):
+        try:
+            text, encoding = content.decode("utf-8"), None
+        except UnicodeDecodeError:
+            text, encoding = base64.b64encode(content).decode("ascii"), "base64"
+        body = request.content or b""
+        entry = {
+            "_key": match_key(request.method, str(request.url), body),
+            "startedDateTime": dt.datetime.now(dt.timezone.utc).isoformat(),
+            "time": round(seconds * 1000, 3),
+            "request": {
+                "method": request.method,
+                "url": _redact(str(request.url)),
+                "httpVersion": "HTTP/1.1",
+                "headers": [{"name": k, "value": v} for k, v in request.headers.items()
+                            if k.lower() not in SECRET_HEADERS],
+                "queryString": [{"name": k, "value": "REDACTED" if k in SECRET_PARAMS else v}
+                                for k, v in request.url.params.multi_items()],
+                "headersSize": -1,
+                "bodySize": len(body),
+            },
+            "response": {
+                "status": response.status_code,
+                "statusText": response.reason_phrase,
+                "httpVersion": response.http_version,
+                "headers": [{"name": k, "value": v} for k, v in response.headers.items()
+                            if k.lower() not in WIRE_HEADERS],
+                "content": {"size": len(content), "mimeType": response.headers.get("content-type", ""),
+                            "text": text, **({"encoding": encoding} if encoding else {})},
+                "redirectURL": response.headers.get("location", ""),
+                "headersSize": -1,
+                "bodySize": len(content),
+            },
+            "cache": {},
+            "timings": {"send": 0, "wait": round(seconds * 1000, 3), "receive": 0},
+        }
+        if body:
+            entry["request"]["postData"] = {"mimeType": request.headers.get("content-type", ""),
+                                            "text": body.decode("utf-8", "replace")}
+        with self._lock:
+            self.entries.append(entry)
+            self.stats["recorded"] += 1
+
+    def lookup(self, request: httpx.Request) -> Optional[dict]:
+        key = match_key(request.method, str(request.url), request.content or b"")
+        with self._lock:
+            positions = self._index.get(key)
+            if not positions:
+                self.stats["missed"] += 1
+                return None
+            n = self._cursor.get(key, 0)
+            self._cursor[key] = n + 1
+            self.stats["replayed"] += 1
+            return self.entries[positions[min(n, len(positions) - 1)]]
+
+    def delay(self, entry: dict) -> float:
+        if self.latency == "recorded":
+            return entry.get("time", 0) / 1000.0
+        return float(self.latency or 0)
+
+    def summary(self) -> str:
+        if self.replaying:
+            return f"{self.stats['replayed']} replayed, {self.stats['missed']} missed from {self.path}"
+        return f"{self.stats['recorded']} recorded to {self.path}"
+
+
+def _response(entry: dict, request: httpx.Request) -> httpx.Response:
+    data = entry["response"]
+    content = data["content"]
+    text = content.get("text", "")
+    body = base64.b64decode(text) if content.get("encoding") == "base64" else text.encode("utf-8")
+    headers = [(h["name"], h["value"]) for h in data.get("headers", [])] + [("x-cassette", "hit")]
+    return httpx.Response(data["status"], headers=headers, content=body, request=request)
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records exchanges through `transport` or replays them from the cassette."""
+
+    def __init__(self, cassette: Cassette, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.cassette = cassette
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.cassette.replaying:
+            entry = self.cassette.lookup(request)
+            if entry is None:
+                return httpx.Response(404, headers={"x-cassette": "miss"}, request=request)
+            delay = self.cassette.delay(entry)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return _response(entry, request)
+        started = time.monotonic()
+        response = await self.transport.handle_async_request(request)
+        try:
+            content = await response.aread()
+        finally:
+            await response.aclose()
+        self.cassette.record(request, response, content, time.monotonic() - started)
+        # The body is already decoded, so the wire headers describing it no longer apply
+        headers = [(k, v) for k, v in response.headers.multi_items() if k.lower() not in WIRE_HEADERS]
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request,
+                              extensions=response.extensions)
+
+    async def aclose(self):
+        if self.transport is not None:
+            await self.transport.aclose()
+
+
+_cassette: Optional[Cassette] = None
+
+
+def configure_cassette(path: Optional[str], mode: str = "replay",
+                       latency: Union[None, float, str] = None) -> Optional[Cassette]:
+    # Called once from main() before any request; record mode writes the file at exit
+    global _cassette
+    _cassette = Cassette(path, mode, latency) if path else None
+    if _cassette is not None and mode == "record":
+        atexit.register(_cassette.save)
+    return _cassette
+
+
+def get_cassette() -> Optional[Cassette]:
+    return _cassette
+
+
+def _latency(value: str) -> Union[float, str]:
+    return value if value == "recorded" else float(value)
+
+
+def add_cassette_arguments(ap: argparse.ArgumentParser):
+    ap.add_argument("--cassette", type=str, default=os.environ.get("SCRAPER_CASSETTE"),
+                    help="HAR cassette (.har.gz) of site and API traffic to record or replay (default SCRAPER_CASSETTE)")
+    ap.add_argument("--cassette-mode", type=str, choices=["record", "replay"],
+                    default=os.environ.get("SCRAPER_CASSETTE_MODE", "replay"),
+                    help="record: call the live sites and save every exchange; replay: serve them from the cassette")
+    ap.add_argument("--replay-latency", type=_latency,
+                    help="Seconds added to each replayed response, or 'recorded' for the recorded timings")
+
+
+def cassette_from_args(args: argparse.Namespace) -> Optional[Cassette]:
+    # Call before configure_cache(): with a cassette the response cache is off, since cache hits would never
+    # reach a recording and replayed responses would be stored in the real cache with live TTLs
+    cassette = configure_cassette(args.cassette, args.cassette_mode, args.replay_latency)
+    if cassette is not None:
+        args.no_cache = True
+        what = f"replaying {len(cassette.entries)} exchanges from" if cassette.replaying else "recording to"
+        print(f"Cassette: {what} {cassette.path} (response cache off)", file=sys.stderr)
+    return cassette
@@ -0,0 +1,94 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+DEFAULT_CHECKPOINT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "wreckshop-scrapers", "checkpoints")
+
+
+class Checkpoint:
+    """Periodic JSON snapshot of a crawl's cursor, frontier and seen-set.
+
+    Crawlers call maybe_save() with a builder as they go (the state is only built
+    when `interval` seconds have passed) and save() from their finally blocks, so
+    an interrupted run leaves its latest position on disk. A run started with
+    --resume loads it back; the job description guards against resuming a
+    different crawl. Writes are atomic (temp file + rename).
+    """
+
+    def __init__(self, path: str, job: Optional[Dict[str, Any]] = None, interval: float = 30.0):
+        self.path = path
+        self.job = job or {}
+        self.interval = interval
+        self.state: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._last = time.monotonic()
+
+    def load(self) -> bool:
+        # True when a checkpoint for this same job was found
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("job") != self.job:
+            print(f"Ignoring checkpoint {self.path}: it belongs to a different job", file=sys.stderr)
+            return False
+        self.state = data.get("state", {})
+        return True
+
+    def get(self, section: str) -> Dict[str, Any]:
+        return self.state.get(section) or {}
+
+    def save(self, section: str, state: Dict[str, Any]):
+        with self._lock:
+            self.state[section] = state
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"job": self.job, "saved_at": time.time(), "state": self.state}, f)
+            os.replace(tmp, self.path)
+            self._last = time.monotonic()
+
+    def maybe_save(self, section: str, build: Callable[[], Dict[str, Any]]) -> bool:
+        if time.monotonic() - self._last < self.interval:
+            return False
+        self.save(section, build())
+        return True
+
+    def clear(self):
+        # The crawl finished; nothing to resume
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def add_checkpoint_arguments(ap: argparse.ArgumentParser):
+    ap.add_argument("--checkpoint", type=str,
+                    help="Checkpoint file. Crawls always checkpoint, by default to a per-job file under "
+                         "~/.cache/wreckshop-scrapers/checkpoints that is deleted when the crawl completes")
+    ap.add_argument("--checkpoint-interval", type=float, default=30.0, help="Seconds between checkpoint writes")
+    ap.add_argument("--resume", action="store_true", help="Continue from the checkpoint of an interrupted run")
+
+
+def checkpoint_from_args(args: argparse.Namespace, name: str, job: Dict[str, Any]) -> Checkpoint:
+    # The default path is derived from the job so different crawls never share a checkpoint
+    if args.checkpoint:
+        path = args.checkpoint
+    else:
+        digest = hashlib.sha256(json.dumps(job, sort_keys=True).encode()).hexdigest()[:12]
+        path = os.path.join(DEFAULT_CHECKPOINT_DIR, f"{name}-{digest}.json")
+    ckpt = Checkpoint(path, job=job, interval=args.checkpoint_interval)
+    if args.resume:
+        if ckpt.load():
+            print(f"Resuming from {path}", file=sys.stderr)
+        else:
+            print(f"No checkpoint to resume at {path}; starting fresh", file=sys.stderr)
+    return ckpt
@@ -1,10 +1,84 @@
 import asyncio
 import os
-from dataclasses import asdict
-from typing import Dict, Iterable, Optional, Union
+from dataclasses import asdict, is_dataclass
+from typing import Dict, Iterable, Optional, Tuple, Union
+from urllib.parse import urlsplit
 
 import httpx
 
+from social_scrapers.cassette import CassetteTransport, get_cassette
+from social_scrapers.metrics import on_http_request, on_http_response
+from social_scrapers.pacing import on_request, on_response
+from social_scrapers.proxypool import PoolTransport, get_proxy_pool, proxied
+
+# Keep-alive pool size per host; anything not listed gets DEFAULT_HOST_CONNECTIONS
+HOST_CONNECTIONS: Dict[str, int] = {
+    "www.googleapis.com": 20,
+    "ws.audioscrobbler.com": 10,
+    "www.last.fm": 8,
+}
+DEFAULT_HOST_CONNECTIONS = 10
+
+_clients: Dict[Tuple[int, str, str], httpx.AsyncClient] = {}
+
+
+def _parse_origins(value: Optional[str]) -> Dict[str, str]:
+    # "https://www.tiktok.com=http://127.0.0.1:8101,..." -> {"www.tiktok.com": "http://127.0.0.1:8101"}
+    origins: Dict[str, str] = {}
+    for part in (value or "").split(","):
+        if "=" in part:
+            site, stand_in = part.split("=", 1)
+            origins[urlsplit(site.strip()).hostname or site.strip()] = stand_in.strip().rstrip("/")
+    return origins
+
+
+# Stand-in origins by host, e.g. the local fixture server of bench.py; empty in normal runs
+_origins: Dict[str, str] = _parse_origins(os.environ.get("SCRAPER_ORIGINS"))
+
+
+def configure_origins(origins: Optional[Dict[str, str]]):
+    global _origins
+    _origins = _parse_origins(",".join(f"{k}={v}" for k, v in (origins or {}).items()))
+
+
+def remap_url(url: str) -> str:
+    # URL on the host's stand-in origin, or the URL itself when the host is not remapped
+    if not _origins:
+        return url
+    parts = urlsplit(url)
+    stand_in = _origins.get(parts.hostname or "")
+    if stand_in is None:
+        return url
+    return stand_in + (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+
+class OriginTransport(httpx.AsyncBaseTransport):
+    """Sends requests for remapped hosts to their stand-in origin.
+
+    The URL is swapped only while the request is on the wire, so pacing, metrics
+    and callers still see the real site's URL.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        original = request.url
+        stand_in = _origins.get(original.host)
+        if stand_in is None:
+            return await self.transport.handle_async_request(request)
+        target = httpx.URL(stand_in)
+        request.url = original.copy_with(scheme=target.scheme, host=target.host, port=target.port)
+        request.headers["Host"] = request.url.netloc.decode("ascii")
+        try:
+            return await self.transport.handle_async_request(request)
+        finally:
+            request.url = original
+            request.headers["Host"] = original.netloc.decode("ascii")
+
+    async def aclose(self):
+        await self.transport.aclose()
+
 
 def build_proxies(proxy: Optional[str] = None,
                   proxy_http: Optional[str] = None,
@@ -22,6 +96,90 @@ def build_proxies(proxy: Optional[str] = None,
         return d or None
 
 
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _scheme_proxy(url: str, proxies: Optional[Union[str, Dict[str, str]]]) -> Optional[str]:
+    # The one proxy a request to `url` would use under `proxies`
+    if isinstance(proxies, dict):
+        return proxies.get(httpx.URL(url).scheme + "://")
+    return proxies
+
+
+def _proxy_key(proxies: Optional[Union[str, Dict[str, str]]]) -> str:
+    if isinstance(proxies, dict):
+        return ";".join(f"{k}={v}" for k, v in sorted(proxies.items()))
+    return proxies or ""
+
+
+def get_client(url: str, proxies: Optional[Union[str, Dict[str, str]]] = None, timeout: float = 20) -> httpx.AsyncClient:
+    # One pooled keep-alive client per (event loop, host, proxy); callers must not close it.
+    # Without an explicit proxy, scraped hosts rotate through the configured proxy pool per request.
+    # Remapped hosts (SCRAPER_ORIGINS) go straight to their stand-in origin.
+    # With a cassette, site and API traffic (never the ingest backend) is recorded or replayed.
+    loop = asyncio.get_running_loop()
+    host = httpx.URL(url).host
+    cassette = get_cassette() if proxied(url) else None
+    replaying = cassette is not None and cassette.replaying
+    remapped = host in _origins and not replaying
+    pool = get_proxy_pool() if proxies is None and proxied(url) and not remapped and not replaying else None
+    key = (id(loop), host, "cassette" if replaying else "origin" if remapped else
+           "pool" if pool is not None else _proxy_key(proxies))
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        conns = HOST_CONNECTIONS.get(host, DEFAULT_HOST_CONNECTIONS)
+        limits = httpx.Limits(max_connections=conns, max_keepalive_connections=conns, keepalive_expiry=30)
+        # Scraped sites are paced per site and every response is checked for block signals and timed.
+        # A replay contacts no site, so it is not paced.
+        hooks = {"request": [on_http_request] if replaying else [on_request, on_http_request],
+                 "response": [on_http_response, on_response]}
+        transport: Optional[httpx.AsyncBaseTransport] = None
+        if remapped:
+            transport = OriginTransport(httpx.AsyncHTTPTransport(http2=_http2_available(), limits=limits))
+        elif pool is not None:
+            # Connection limits apply per proxy, so throughput grows with the pool
+            transport = PoolTransport(pool, http2=_http2_available(), limits=limits)
+        elif cassette is not None and not replaying:
+            transport = httpx.AsyncHTTPTransport(proxy=_scheme_proxy(url, proxies), http2=_http2_available(),
+                                                 limits=limits)
+        if cassette is not None:
+            transport = CassetteTransport(cassette, transport)
+        if transport is not None:
+            client = httpx.AsyncClient(timeout=timeout, transport=transport, event_hooks=hooks)
+        else:
+            client = httpx.AsyncClient(
+                timeout=timeout,
+                proxies=proxies,
+                http2=_http2_available(),
+                limits=limits,
+                event_hooks=hooks,
+            )
+        _clients[key] = client
+    return client
+
+
+async def close_clients():
+    # Close every pooled client owned by the running loop; call once at the end of main()
+    loop_id = id(asyncio.get_running_loop())
+    for key in [k for k in _clients if k[0] == loop_id]:
+        client = _clients.pop(key)
+        if not client.is_closed:
+            await client.aclose()
+
+
+async def with_clients(coro):
+    # Entry-point wrapper: asyncio.run(with_clients(main())) releases pooled connections on exit
+    try:
+        return await coro
+    finally:
+        await close_clients()
+
+
 def write_jsonl(path: str, items: Iterable[dict]):
     import orjson
     with open(path, "wb") as f:
@@ -30,17 +188,26 @@ def write_jsonl(path: str, items: Iterable[dict]):
             f.write(b"\n")
 
 
-async def ingest_candidates(backend: str, items: Iterable[dict], provider: str, delay_ms=(150, 450)):
-    backend = backend.rstrip("/")
-    low, high = delay_ms
-    async with httpx.AsyncClient(timeout=20) as client:
-        for c in items:
-            try:
-                handle_or_url = c.get("profile_url") or c.get("handle") or c.get("id")
-                await client.post(f"{backend}/api/profiles/ingest", json={
-                    "provider": provider,
-                    "handleOrUrl": handle_or_url,
-                })
-            except Exception:
-                pass
-            await asyncio.sleep((low + (high - low) * 0.5) / 1000.0)
+class JsonlWriter:
+    # Streaming counterpart of write_jsonl: each record is flushed as it arrives so a crash keeps prior output
+    def __init__(self, path: str, append: bool = False):
+        import orjson
+        self._dumps = orjson.dumps
+        # Resumed crawls append to the output of the interrupted run
+        self._f = open(path, "ab" if append else "wb")
+
+    def write(self, item):
+        if is_dataclass(item):
+            item = asdict(item)
+        self._f.write(self._dumps(item))
+        self._f.write(b"\n")
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -3,9 +3,8 @@
 import argparse
 import asyncio
 import os
-import random
 import sys
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver import Chrome
@@ -15,7 +14,15 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from social_scrapers.common import write_jsonl, ingest_candidates
+from social_scrapers.blocking import add_blocking_arguments, apply_blocking, blocking_from_args, blocking_options, network_stats
+from social_scrapers.browser import ScrollWaiter, collect_new_anchors, load_page, quit_driver
+from social_scrapers.common import with_clients
+from social_scrapers.ingest import Ingestor
+from social_scrapers.metrics import add_metrics_arguments, metrics_from_args
+from social_scrapers.pacing import add_pacing_arguments, pacing_from_args, pacing_summary
+from social_scrapers.pipeline import iterate_in_thread, run_pipeline
+from social_scrapers.proxypool import add_proxy_pool_arguments, bind_proxy, lease_proxy, proxy_pool_from_args
+from social_scrapers.state import add_state_arguments, state_from_args
 
 
 def make_driver(headless: bool = True, proxy_server: Optional[str] = None) -> Chrome:
@@ -25,10 +32,13 @@ def make_driver(headless: bool = True, proxy_server: Optional[str] = None) -> Ch
     options.add_argument("--disable-gpu")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
+    # The logged-in session keeps one address, even across browsers
+    proxy_server = proxy_server or lease_proxy("facebook")
     if proxy_server:
         options.add_argument(f"--proxy-server={proxy_server}")
     driver_path = os.environ.get("CHROMEDRIVER", "/usr/bin/chromedriver")
-    return Chrome(service=Service(driver_path), options=options)
+    blocking_options(options)
+    return bind_proxy(apply_blocking(Chrome(service=Service(driver_path), options=options)), proxy_server)
 
 
 def parse_cookie_header(cookie_header: str):
@@ -44,23 +54,21 @@ def parse_cookie_header(cookie_header: str):
     return cookies
 
 
-def search_people(driver: Chrome, query: str, limit: int) -> List[dict]:
+def iter_search_people(driver: Chrome, query: str, limit: int) -> Iterator[dict]:
     # Use mobile site for simpler DOM
-    driver.get(f"https://m.facebook.com/search/people/?q={query}")
+    load_page(driver, f"https://m.facebook.com/search/people/?q={query}")
     try:
         WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
     except Exception:
         pass
 
     seen = set()
-    out: List[dict] = []
-    stagnant = 0
-    last = 0
-    import time
-    while len(out) < limit and stagnant < 10:
-        anchors = driver.find_elements(By.CSS_SELECTOR, "a[href*='facebook.com/']")
+    count = 0
+    waiter = ScrollWaiter(driver, "a[href*='facebook.com/']")
+    while count < limit and not waiter.done:
+        anchors = collect_new_anchors(driver, "a[href*='facebook.com/']")
         for a in anchors:
-            href = a.get_attribute("href") or ""
+            href = a["href"]
             if not href:
                 continue
             # Normalize to www domain for profile pages
@@ -80,24 +88,38 @@ def search_people(driver: Chrome, query: str, limit: int) -> List[dict]:
             handle = base.rstrip("/").rsplit("/", 1)[-1]
             if not handle or handle in ("profile.php", "login", "search"):
                 continue
-            display = a.text.strip() or handle
-            out.append({
+            display = a["text"] or handle
+            yield {
                 "provider": "facebook",
                 "providerUserId": handle,
                 "displayName": display,
                 "handle": handle,
                 "profile_url": base,
-            })
-            if len(out) >= limit:
+            }
+            count += 1
+            if count >= limit:
                 break
-        driver.execute_script("window.scrollBy(0, 1200);")
-        time.sleep(random.uniform(0.9, 1.7))
-        if len(out) == last:
-            stagnant += 1
-        else:
-            stagnant = 0
-            last = len(out)
-    return out[:limit]
+        if count < limit:
+            waiter.scroll("window.scrollBy(0, 1200);")
+
+
+def search_people(driver: Chrome, query: str, limit: int) -> List[dict]:
+    return list(iter_search_people(driver, query, limit))
+
+
+def iter_search_session(query: str, limit: int, headless: bool, proxy_server: Optional[str], cookie_header: str) -> Iterator[dict]:
+    # Owns the browser for one cookie-authenticated people search
+    driver = make_driver(headless=headless, proxy_server=proxy_server)
+    try:
+        load_page(driver, "https://www.facebook.com")
+        for c in parse_cookie_header(cookie_header):
+            try:
+                driver.add_cookie(c)
+            except Exception:
+                pass
+        yield from iter_search_people(driver, query, limit)
+    finally:
+        quit_driver(driver)
 
 
 async def main():
@@ -110,33 +132,42 @@ async def main():
     ap.add_argument("--emit-jsonl", type=str)
     ap.add_argument("--backend", type=str)
     ap.add_argument("--ingest", action="store_true")
+    add_state_arguments(ap)
+    add_blocking_arguments(ap)
+    add_pacing_arguments(ap)
+    add_proxy_pool_arguments(ap)
+    add_metrics_arguments(ap)
     args = ap.parse_args()
-
-    driver = make_driver(headless=not args.headful, proxy_server=args.proxy_server)
-    results: List[dict] = []
-    try:
-        driver.get("https://www.facebook.com")
-        for c in parse_cookie_header(args.cookie):
-            try:
-                driver.add_cookie(c)
-            except Exception:
-                pass
-        results = search_people(driver, args.query, args.limit)
-    finally:
-        driver.quit()
+    blocking = blocking_from_args(args, "facebook")
+    pacing = pacing_from_args(args)
+    proxy_pool = proxy_pool_from_args(args)
+    metrics_from_args(args, "facebook")
+
+    # Stream results straight to JSONL/ingest as the search page scrolls
+    source = iterate_in_thread(iter_search_session, args.query, args.limit, headless=not args.headful,
+                               proxy_server=args.proxy_server, cookie_header=args.cookie)
+    ingestor = Ingestor(args.backend, "facebook") if args.backend and args.ingest else None
+    state = state_from_args(args, "facebook")
+    result = await run_pipeline(source, jsonl_path=args.emit_jsonl, ingestor=ingestor, state=state)
 
     if args.emit_jsonl:
-        write_jsonl(args.emit_jsonl, results)
-        print(f"Wrote {len(results)} users to {args.emit_jsonl}")
+        print(f"Wrote {result.count} users to {args.emit_jsonl}")
 
-    if args.backend and args.ingest and results:
-        await ingest_candidates(args.backend, results, provider="facebook")
-        print(f"Ingest requested for {len(results)} users at {args.backend}")
+    if ingestor:
+        print(f"Ingest requested for {len(result.ingest.succeeded)} users at {args.backend} ({result.ingest.summary()})")
 
-    print(f"Discovered {len(results)} Facebook users")
-    if results:
-        print(f"Example: {results[0].get('displayName')} -> {results[0].get('profile_url')}")
+    print(f"Discovered {result.count} Facebook users")
+    if state is not None:
+        print(f"Skipped {result.known} profiles already processed in the last {args.refresh_days:g} days")
+    if blocking.enabled:
+        print(f"Network: {network_stats().summary()}")
+    if pacing:
+        print(f"Pacing: {pacing_summary()}")
+    if proxy_pool is not None:
+        print(f"Proxies: {proxy_pool.summary()}")
+    if result.first:
+        print(f"Example: {result.first.get('displayName')} -> {result.first.get('profile_url')}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(with_clients(main()))
@@ -0,0 +1,378 @@
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# Real origins each fixture site stands in for (see SCRAPER_ORIGINS in common.py)
+SITE_ORIGINS: Dict[str, Tuple[str, ...]] = {
+    "tiktok": ("https://www.tiktok.com",),
+    "youtube": ("https://www.youtube.com",),
+    "spotify": ("https://open.spotify.com",),
+    "instagram": ("https://www.instagram.com",),
+    "facebook": ("https://www.facebook.com", "https://m.facebook.com"),
+    "lastfm": ("https://www.last.fm",),
+    "lastfm_api": ("https://ws.audioscrobbler.com",),
+    "youtube_api": ("https://www.googleapis.com",),
+}
+
+# Artists on a fixture tag page; each has its own +listeners list
+TAG_ARTISTS = 8
+
+Response = Tuple[int, str, bytes]
+
+
+@dataclass
+class FixtureConfig:
+    items: int = 500
+    # Entries per lazy-load batch, server-rendered list page or API page
+    page_size: int = 20
+    # Seconds each lazy-load batch, list page or API response takes
+    latency: float = 0.05
+
+
+def _html(body: str, title: str = "fixture", head: str = "") -> Response:
+    page = (f"<!doctype html><html><head><meta charset='utf-8'><title>{title}</title>{head}"
+            "<style>.row{display:block;height:120px} ytd-search,ytd-app,ytd-browse,ytd-channel-renderer"
+            "{display:block}</style></head>"
+            f"<body>{body}</body></html>")
+    return 200, "text/html; charset=utf-8", page.encode()
+
+
+def _json(data) -> Response:
+    return 200, "application/json", json.dumps(data).encode()
+
+
+def _not_found() -> Response:
+    return 404, "text/plain", b"not found"
+
+
+# Infinite-scroll list: fetches `more` + cursor on load and whenever the scroller nears its bottom. The
+# JSON reply carries the rows as html plus the next cursor (null at the end, when `end` is appended).
+_SCROLL_JS = """
+<script>
+(() => {
+  const list = document.getElementById('list');
+  const box = document.querySelector(%(scroller)s);
+  const scroller = box || window;
+  const target = box || document.scrollingElement;
+  let cursor = 0, busy = false;
+  async function more() {
+    if (busy || cursor === null) return;
+    busy = true;
+    const data = await (await fetch(%(more)s + cursor)).json();
+    list.insertAdjacentHTML('beforeend', data.html);
+    cursor = data.cursor;
+    busy = false;
+    if (cursor === null) list.insertAdjacentHTML('afterend', %(end)s);
+  }
+  scroller.addEventListener('scroll', () => {
+    if (target.scrollTop + target.clientHeight >= target.scrollHeight - 400) more();
+  });
+  more();
+})();
+</script>
+"""
+
+
+def _scroll_page(more: str, before: str = "", after: str = "", scroller: Optional[str] = None,
+                 end: str = "", title: str = "fixture") -> Response:
+    script = _SCROLL_JS % {"more": json.dumps(more), "scroller": json.dumps(scroller or "#no-scroller"),
+                           "end": json.dumps(end)}
+    return _html(f"{before}<div id='list'></div>{after}{script}", title)
+
+
+class Fixtures:
+    """Deterministic stand-ins for every provider's list pages, APIs and the ingest backend.
+
+    Users are numbered; list pages serve `items` entries in `page_size` batches, each
+    batch (and each API response) delayed by `latency`. The ingest endpoint accepts
+    the single and batch bodies and records when each profile arrived.
+    """
+
+    def __init__(self, config: FixtureConfig):
+        self.config = config
+        self._lock = threading.Lock()
+        self.ingested: List[float] = []
+
+    def reset(self):
+        with self._lock:
+            self.ingested = []
+
+    def _slow(self):
+        if self.config.latency > 0:
+            time.sleep(self.config.latency)
+
+    def _batch(self, cursor: int) -> Tuple[range, Optional[int]]:
+        # Entry numbers of one batch and the cursor of the next (None at the end)
+        end = min(self.config.items, cursor + self.config.page_size)
+        return range(cursor, end), (end if end < self.config.items else None)
+
+    @staticmethod
+    def _cursor(query: Dict[str, List[str]], name: str = "cursor") -> int:
+        try:
+            return max(0, int(query.get(name, ["0"])[0]))
+        except ValueError:
+            return 0
+
+    def _more(self, query: Dict[str, List[str]], row: Callable[[int], str]) -> Response:
+        self._slow()
+        numbers, cursor = self._batch(self._cursor(query))
+        return _json({"html": "".join(row(n) for n in numbers), "cursor": cursor})
+
+    # --- TikTok: user search fed by the search API the page fetches; profile pages with counts
+
+    def tiktok(self, path: str, query: Dict[str, List[str]]) -> Response:
+        if path == "/api/search/user/full/":
+            self._slow()
+            numbers, cursor = self._batch(self._cursor(query))
+            users = [{"user_info": {"unique_id": f"tt{n:05d}", "nickname": f"TikTok User {n}",
+                                    "follower_count": n * 13, "following_count": n % 300,
+                                    "total_favorited": n * 101, "signature": f"bio {n}"}} for n in numbers]
+            rows = "".join(f"<div class='row'><a href='/@tt{n:05d}'>tt{n:05d}</a><p>TikTok User {n}</p></div>"
+                           for n in numbers)
+            return _json({"user_list": users, "cursor": cursor, "has_more": int(cursor is not None),
+                          "html": rows})
+        if path == "/search/user":
+            return _scroll_page("/api/search/user/full/?keyword=fixture&cursor=", title="TikTok search")
+        if path.startswith("/@"):
+            n = sum(map(ord, path))
+            return _html(f"<strong data-e2e='followers-count'>{n}K</strong>"
+                         f"<strong data-e2e='following-count'>{n % 500}</strong>"
+                         f"<strong data-e2e='likes-count'>{n * 3}K</strong>")
+        return _html("<p>TikTok fixture</p>") if path == "/" else _not_found()
+
+    # --- YouTube web: channel search results and channel pages
+
+    def youtube(self, path: str, query: Dict[str, List[str]]) -> Response:
+        if path == "/_more":
+            return self._more(query, lambda n: (f"<ytd-channel-renderer class='row'>"
+                                                f"<a href='/channel/UC{n:022d}'>Channel {n}</a></ytd-channel-renderer>"))
+        if path == "/results":
+            return _scroll_page("/_more?cursor=", before="<ytd-search>", after="</ytd-search>",
+                                end="<ytd-message-renderer>No more results</ytd-message-renderer>",
+                                title="YouTube search")
+        if path.startswith(("/channel/", "/@")):
+            return _html("<ytd-app><ytd-browse><span id='subscriber-count'>12.3K subscribers</span>"
+                         "</ytd-browse></ytd-app>", head="<meta name='description' content='Fixture channel'>")
+        return _html("<ytd-app></ytd-app>") if path == "/" else _not_found()
+
+    # --- Spotify: artist/playlist search and a seed user's followers/following
+
+    def spotify(self, path: str, query: Dict[str, List[str]]) -> Response:
+        if path == "/_more":
+            return self._more(query, lambda n: f"<div class='row'><a href='/user/sp{n:05d}'>Listener {n}</a></div>")
+        if path == "/search" or (path.startswith("/user/") and path.endswith(("/followers", "/following"))):
+            return _scroll_page("/_more?cursor=", title="Spotify")
+        return _html("<p>Spotify fixture</p>") if path == "/" else _not_found()
+
+    # --- Instagram: followers/following dialog that scrolls inside itself
+
+    def instagram(self, path: str, query: Dict[str, List[str]]) -> Response:
+        if path == "/_more":
+            return self._more(query, lambda n: (f"<div class='row'><a href='https://www.instagram.com/ig{n:05d}/'>"
+                                                f"ig{n:05d}</a></div>"))
+        parts = [p for p in path.split("/") if p]
+        if len(parts) == 2 and parts[1] in ("followers", "following"):
+            return _scroll_page("/_more?cursor=", before="<div role='dialog' style='height:600px;overflow:auto'>",
+                                after="</div>", scroller="div[role=dialog]", title="Instagram")
+        if len(parts) == 1:
+            return _html(f"<header>{parts[0]}</header>")
+        return _html("<p>Instagram fixture</p>") if path == "/" else _not_found()
+
+    # --- Facebook: mobile people search
+
+    def facebook(self, path: str, query: Dict[str, List[str]]) -> Response:
+        if path == "/_more":
+            return self._more(query, lambda n: (f"<div class='row'><a href='https://www.facebook.com/fb.{n:05d}'>"
+                                                f"Person {n}</a></div>"))
+        if path == "/search/people/":
+            return _scroll_page("/_more?cursor=", title="Facebook search")
+        return _html("<p>Facebook fixture</p>") if path == "/" else _not_found()
+
+    # --- Last.fm: server-rendered tag and paginated user lists, plus the JSON API
+
+    def _user_list_page(self, offset: int, query: Dict[str, List[str]]) -> Response:
+        self._slow()
+        size = self.config.page_size
+        last = max(1, math.ceil(self.config.items / size))
+        page = max(1, self._cursor(query, "page"))
+        if page > last:
+            return _not_found()
+        start = (page - 1) * size
+        rows = "".join(f"<div class='row'><a href='/user/lf{offset + n:05d}'>lf{offset + n:05d}</a></div>"
+                       for n in range(start, min(self.config.items, start + size)))
+        pages = "".join(f"<li><a href='?page={n}'>{n}</a></li>" for n in range(1, last + 1))
+        return _html(f"<div id='list'>{rows}</div><nav class='pagination'><ul class='pagination-list'>{pages}"
+                     "</ul></nav>", "Last.fm")
+
+    def lastfm(self, path: str, query: Dict[str, List[str]]) -> Response:
+        parts = [p for p in path.split("/") if p]
+        if len(parts) == 3 and parts[0] == "tag" and parts[2] == "artists":
+            self._slow()
+            links = "".join(f"<h3><a href='/music/FixtureArtist{a}'>FixtureArtist{a}</a></h3>" for a in range(TAG_ARTISTS))
+            return _html(links, "Last.fm tag")
+        if len(parts) == 3 and parts[0] == "music" and parts[2] == "+listeners":
+            # Listener lists of neighbouring artists overlap by half, as real audiences do
+            a = int(parts[1].rsplit("FixtureArtist", 1)[-1]) if parts[1].startswith("FixtureArtist") else 0
+            return self._user_list_page(a * self.config.items // 2, query)
+        if len(parts) == 3 and parts[0] == "user" and parts[2] in ("neighbours", "following", "followers"):
+            return self._user_list_page(("neighbours", "following", "followers").index(parts[2]) * self.config.items,
+                                        query)
+        return _html("<p>Last.fm fixture</p>") if path == "/" else _not_found()
+
+    def lastfm_api(self, path: str, query: Dict[str, List[str]]) -> Response:
+        self._slow()
+        method = query.get("method", [""])[0]
+        user = query.get("user", ["unknown"])[0]
+        if method == "user.getinfo":
+            return _json({"user": {"name": user, "realname": user.upper(), "country": "United States",
+                                   "playcount": str(sum(map(ord, user)) * 97), "url": f"https://www.last.fm/user/{user}",
+                                   "image": [{"size": "large", "#text": f"https://img.example/{user}.png"}]}})
+        if method == "user.gettoptags":
+            return _json({"toptags": {"tag": [{"name": t} for t in ("rnb", "soul", "hip-hop")]}})
+        if method == "user.gettopartists":
+            return _json({"topartists": {"artist": [{"name": f"FixtureArtist{a}"} for a in range(3)]}})
+        return _json({"error": 3, "message": "Invalid method"})
+
+    # --- YouTube Data API: search, channels and featured-channel sections
+
+    def _channel(self, channel_id: str) -> dict:
+        n = int(channel_id[2:]) if channel_id[2:].isdigit() else 0
+        featured = [f"UC{(n * 7 + k) % max(1, self.config.items):022d}" for k in (1, 2, 3)]
+        return {"id": channel_id,
+                "snippet": {"title": f"Channel {n}", "description": f"Fixture channel {n}",
+                            "thumbnails": {"default": {"url": f"https://img.example/{channel_id}.jpg"}}},
+                "statistics": {"subscriberCount": str(n * 31), "videoCount": str(n % 200)},
+                "brandingSettings": {"channel": {"featuredChannelsUrls": featured}}}
+
+    def youtube_api(self, path: str, query: Dict[str, List[str]]) -> Response:
+        self._slow()
+        resource = path.rstrip("/").rsplit("/", 1)[-1]
+        if resource == "search":
+            numbers, cursor = self._batch(self._cursor(query, "pageToken"))
+            data = {"items": [{"id": {"channelId": f"UC{n:022d}"}, "snippet": {"channelId": f"UC{n:022d}"}}
+                              for n in numbers]}
+            if cursor is not None:
+                data["nextPageToken"] = str(cursor)
+            return _json(data)
+        if resource == "channels":
+            if "forHandle" in query:
+                return _json({"items": [{"id": f"UC{0:022d}"}]})
+            ids = [i for i in query.get("id", [""])[0].split(",") if i]
+            return _json({"items": [self._channel(i) for i in ids]})
+        if resource == "channelSections":
+            channel = self._channel(query.get("channelId", [""])[0])
+            return _json({"items": [{"contentDetails": {"channels":
+                                                        channel["brandingSettings"]["channel"]["featuredChannelsUrls"]}}]})
+        return _not_found()
+
+    # --- Ingest backend: POST /api/profiles/ingest, single or { items: [...] }
+
+    def backend(self, path: str, body: dict) -> Response:
+        if path != "/api/profiles/ingest":
+            return _not_found()
+        self._slow()
+        items = body.get("items") if isinstance(body.get("items"), list) else [body]
+        now = time.monotonic()
+        with self._lock:
+            self.ingested.extend([now] * len(items))
+        if "items" in body:
+            return _json({"ok": True, "results": [{"ok": True, "jobId": f"job-{i}"} for i in range(len(items))]})
+        return _json({"ok": True, "jobId": "job"})
+
+    def ingest_rate(self) -> Tuple[int, Optional[float]]:
+        # Profiles ingested and their rate over the window they arrived in
+        with self._lock:
+            times = list(self.ingested)
+        if len(times) < 2 or times[-1] <= times[0]:
+            return len(times), None
+        return len(times), (len(times) - 1) / (times[-1] - times[0])
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, response: Response):
+        status, content_type, body = response
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self):
+        if self.server.site == "backend":
+            self._send(_not_found())
+            return
+        parts = urlsplit(self.path)
+        self._send(getattr(self.server.fixtures, self.server.site)(parts.path or "/", parse_qs(parts.query)))
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            body = {}
+        if self.server.site != "backend" or not isinstance(body, dict):
+            self._send(_not_found())
+            return
+        self._send(self.server.fixtures.backend(urlsplit(self.path).path, body))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """One local HTTP server per site on 127.0.0.1, plus the ingest backend.
+
+    Scrapers reach it through SCRAPER_ORIGINS (env()), which maps each real origin
+    to its fixture port; nothing leaves the machine.
+    """
+
+    def __init__(self, config: Optional[FixtureConfig] = None, host: str = "127.0.0.1"):
+        self.fixtures = Fixtures(config or FixtureConfig())
+        self.host = host
+        self._servers: Dict[str, ThreadingHTTPServer] = {}
+
+    def start(self) -> "FixtureServer":
+        for site in list(SITE_ORIGINS) + ["backend"]:
+            server = ThreadingHTTPServer((self.host, 0), _Handler)
+            server.daemon_threads = True
+            server.site = site
+            server.fixtures = self.fixtures
+            threading.Thread(target=server.serve_forever, name=f"fixture-{site}", daemon=True).start()
+            self._servers[site] = server
+        return self
+
+    def url(self, site: str) -> str:
+        return f"http://{self.host}:{self._servers[site].server_address[1]}"
+
+    @property
+    def backend_url(self) -> str:
+        return self.url("backend")
+
+    def origins(self) -> Dict[str, str]:
+        return {origin: self.url(site) for site, origins in SITE_ORIGINS.items() for origin in origins}
+
+    def env(self) -> Dict[str, str]:
+        return {"SCRAPER_ORIGINS": ",".join(f"{k}={v}" for k, v in self.origins().items())}
+
+    def stop(self):
+        for server in self._servers.values():
+            server.shutdown()
+            server.server_close()
+        self._servers.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,86 @@
+import threading
+from collections import Counter, deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from social_scrapers.seen import ExactSeen, SeenSet, restore_seen, snapshot_seen
+
+
+class Frontier:
+    """FIFO crawl frontier: a deque keeps BFS order, a seen-set indexes every node ever admitted."""
+
+    def __init__(self, max_depth: Optional[int] = None, per_depth_limit: Optional[int] = None,
+                 max_pending: Optional[int] = None, index: Optional[SeenSet] = None):
+        self.max_depth = max_depth
+        self.per_depth_limit = per_depth_limit
+        self.max_pending = max_pending
+        self._queue: Deque[Tuple[str, int]] = deque()
+        self._index: SeenSet = index if index is not None else ExactSeen()
+        self._depth_counts: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._index
+
+    def push(self, node: str, depth: int = 0) -> bool:
+        # Returns False when the node was already admitted or a limit rejects it
+        if not node or node in self._index:
+            return False
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        if self.per_depth_limit is not None and self._depth_counts[depth] >= self.per_depth_limit:
+            return False
+        if self.max_pending is not None and len(self._queue) >= self.max_pending:
+            return False
+        if not self._index.add(node):
+            return False
+        self._depth_counts[depth] += 1
+        self._queue.append((node, depth))
+        return True
+
+    def pop(self) -> Tuple[str, int]:
+        return self._queue.popleft()
+
+    def pop_batch(self, n: int) -> List[Tuple[str, int]]:
+        batch: List[Tuple[str, int]] = []
+        while self._queue and len(batch) < n:
+            batch.append(self._queue.popleft())
+        return batch
+
+    def snapshot(self, in_flight: Iterable[Tuple[str, int]] = ()) -> Dict:
+        # JSON-able state for a checkpoint; popped-but-unfinished nodes go back to the head of the queue
+        return {
+            "queue": [list(n) for n in in_flight] + [list(n) for n in self._queue],
+            "depth_counts": {str(d): c for d, c in self._depth_counts.items()},
+            "index": snapshot_seen(self._index),
+        }
+
+    def restore(self, snap: Dict):
+        self._queue = deque((node, int(depth)) for node, depth in snap.get("queue", []))
+        self._depth_counts = Counter({int(d): c for d, c in snap.get("depth_counts", {}).items()})
+        restore_seen(self._index, snap.get("index"))
+        # Queued nodes were admitted before the checkpoint even if the index is a fresh Bloom filter
+        self._index.update(node for node, _ in self._queue)
+
+
+class SharedBudget:
+    """Global result budget plus dedupe set shared by parallel crawl workers (thread-safe)."""
+
+    def __init__(self, max_items: int, seen: Optional[SeenSet] = None):
+        self.max_items = max_items
+        self.seen: SeenSet = seen if seen is not None else ExactSeen()
+        self.claimed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.claimed >= self.max_items
+
+    def claim(self, key: str) -> bool:
+        # True exactly once per key, and only while budget remains
+        with self._lock:
+            if self.claimed >= self.max_items or not self.seen.add(key):
+                return False
+            self.claimed += 1
+            return True
@@ -0,0 +1,225 @@
+import asyncio
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass, field, is_dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+
+from social_scrapers.common import get_client
+from social_scrapers.metrics import inc, timer
+from social_scrapers.ratelimit import retry_after_seconds
+
+# Upper bound enforced by the backend for the { items: [...] } batch form
+MAX_BATCH_SIZE = 100
+
+
+@dataclass
+class IngestResult:
+    handle_or_url: str
+    ok: bool
+    status: Optional[int] = None
+    job_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class IngestReport:
+    results: List[IngestResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def succeeded(self) -> List[IngestResult]:
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self) -> List[IngestResult]:
+        return [r for r in self.results if not r.ok]
+
+    def summary(self) -> str:
+        rate = len(self.results) / self.elapsed if self.elapsed > 0 else 0.0
+        return f"{len(self.succeeded)} ok, {len(self.failed)} failed in {self.elapsed:.1f}s ({rate:.1f}/s)"
+
+
+def candidate_ref(item) -> Optional[str]:
+    # Accepts both dict candidates and the Candidate dataclasses used by the Last.fm/Spotify scrapers
+    if is_dataclass(item):
+        item = asdict(item)
+    if isinstance(item, dict):
+        return item.get("profile_url") or item.get("handle") or item.get("id")
+    return str(item) if item else None
+
+
+class Ingestor:
+    """Posts candidates to /api/profiles/ingest with adaptive bounded concurrency.
+
+    Concurrency grows by one after a window of clean responses and halves on 429,
+    whose Retry-After pauses every worker. With batch_size > 1 items go out in the
+    backend's { items: [...] } form; a backend without batch support falls back to
+    single posts for the rest of the run, while a batch rejected for one invalid
+    item is retried as single posts without giving up on batching.
+    """
+
+    def __init__(self, backend: str, provider: str, concurrency: int = 8, batch_size: int = 1,
+                 max_retries: int = 4, delay_ms: Optional[Tuple[int, int]] = None,
+                 client: Optional[httpx.AsyncClient] = None):
+        self.url = backend.rstrip("/") + "/api/profiles/ingest"
+        self.provider = provider
+        self.max_concurrency = max(1, concurrency)
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.max_retries = max_retries
+        self.delay_ms = delay_ms
+        self._client = client
+        self._limit = self.max_concurrency
+        self._active = 0
+        self._clean = 0
+        self._paused_until = 0.0
+        self._cond = asyncio.Condition()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_client(self.url)
+
+    async def _acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self._limit)
+            self._active += 1
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+    async def _release(self):
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    async def _on_throttled(self, retry_after: Optional[float]):
+        async with self._cond:
+            # Responses already in flight when the first 429 lands should not halve again
+            if time.monotonic() >= self._paused_until:
+                self._limit = max(1, self._limit // 2)
+            self._clean = 0
+        wait = retry_after if retry_after is not None else 1.0
+        self._paused_until = max(self._paused_until, time.monotonic() + wait)
+
+    async def _on_clean(self):
+        async with self._cond:
+            self._clean += 1
+            if self._clean >= self._limit and self._limit < self.max_concurrency:
+                self._limit += 1
+                self._clean = 0
+                self._cond.notify_all()
+
+    def _payload(self, ref: str) -> dict:
+        return {"provider": self.provider, "handleOrUrl": ref}
+
+    async def _post(self, body: dict) -> httpx.Response:
+        # Retries 429/5xx/transport errors; any other response is returned to the caller
+        attempt = 0
+        while True:
+            await self._acquire()
+            try:
+                with timer("ingest_request_seconds", provider=self.provider):
+                    resp = await self.client.post(self.url, json=body)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                resp = None
+            finally:
+                # Optional politeness delay holds the slot so it paces each worker
+                if self.delay_ms:
+                    await asyncio.sleep(random.uniform(*self.delay_ms) / 1000.0)
+                await self._release()
+            if resp is not None and resp.status_code == 429:
+                await self._on_throttled(retry_after_seconds(resp.headers.get("Retry-After")))
+            elif resp is not None and resp.status_code < 500:
+                await self._on_clean()
+                return resp
+            if attempt >= self.max_retries:
+                return resp
+            attempt += 1
+            inc("retries_total", component="ingest")
+            if resp is None or resp.status_code >= 500:
+                await asyncio.sleep(min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.8, 1.2))
+
+    async def _send_one(self, ref: str) -> IngestResult:
+        try:
+            resp = await self._post(self._payload(ref))
+        except Exception as e:
+            return IngestResult(ref, ok=False, error=str(e) or type(e).__name__)
+        data = _json_or_empty(resp)
+        ok = resp.status_code == 200 and bool(data.get("ok", True))
+        return IngestResult(ref, ok=ok, status=resp.status_code, job_id=_str_or_none(data.get("jobId")),
+                            error=None if ok else _error_text(resp, data))
+
+    async def _send_batch(self, refs: Sequence[str]) -> List[IngestResult]:
+        if len(refs) == 1:
+            return [await self._send_one(refs[0])]
+        try:
+            resp = await self._post({"items": [self._payload(r) for r in refs]})
+        except Exception as e:
+            return [IngestResult(r, ok=False, error=str(e) or type(e).__name__) for r in refs]
+        data = _json_or_empty(resp)
+        results = data.get("results")
+        if resp.status_code == 200 and isinstance(results, list) and len(results) == len(refs):
+            return [IngestResult(ref, ok=bool(res.get("ok")), status=resp.status_code,
+                                 job_id=_str_or_none(res.get("jobId")), error=res.get("error"))
+                    for ref, res in zip(refs, results)]
+        if resp.status_code in (404, 405, 413) or (resp.status_code == 400 and not _batch_understood(data)):
+            # Older backends reject the batch body; degrade to single posts from here on
+            self.batch_size = 1
+            return list(await asyncio.gather(*[self._send_one(r) for r in refs]))
+        if resp.status_code in (400, 422):
+            # The backend validated the batch and rejected an item: post this chunk singly so only that item fails
+            return list(await asyncio.gather(*[self._send_one(r) for r in refs]))
+        error = _error_text(resp, data)
+        return [IngestResult(r, ok=False, status=resp.status_code, error=error) for r in refs]
+
+    async def send(self, items: Sequence) -> List[IngestResult]:
+        # Post one chunk (up to batch_size items) and return its per-item results
+        refs = [r for r in (candidate_ref(c) for c in items) if r]
+        return await self._send_batch(refs) if refs else []
+
+    async def submit(self, items: Iterable) -> IngestReport:
+        started = time.monotonic()
+        refs = [r for r in (candidate_ref(c) for c in items) if r]
+        chunks = [refs[i:i + self.batch_size] for i in range(0, len(refs), self.batch_size)]
+        batches = await asyncio.gather(*[self._send_batch(chunk) for chunk in chunks])
+        report = IngestReport(results=[r for batch in batches for r in batch])
+        report.elapsed = time.monotonic() - started
+        return report
+
+
+def _json_or_empty(resp: httpx.Response) -> dict:
+    try:
+        data = resp.json()
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _batch_understood(data: dict) -> bool:
+    # A batch-aware backend reports validation errors under `items`; an older one validates the body as a
+    # single profile and complains about provider/handleOrUrl instead
+    err = data.get("error")
+    return isinstance(err, dict) and "items" in (err.get("fieldErrors") or {})
+
+
+def _str_or_none(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _error_text(resp: httpx.Response, data: dict) -> str:
+    err = data.get("error")
+    return str(err) if err else f"HTTP {resp.status_code}"
+
+
+async def ingest_candidates(backend: str, items: Iterable, provider: str, concurrency: int = 8,
+                            batch_size: int = 1, delay_ms: Optional[Tuple[int, int]] = None,
+                            client: Optional[httpx.AsyncClient] = None) -> IngestReport:
+    report = await Ingestor(backend, provider, concurrency=concurrency, batch_size=batch_size,
+                            delay_ms=delay_ms, client=client).submit(items)
+    for r in report.failed:
+        print(f"Failed to ingest {r.handle_or_url}: {r.error}", file=sys.stderr)
+    return report
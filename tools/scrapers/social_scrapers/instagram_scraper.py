@@ -3,9 +3,8 @@
 import argparse
 import asyncio
 import os
-import random
 import sys
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver import Chrome
@@ -15,7 +14,15 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from social_scrapers.common import write_jsonl, ingest_candidates
+from social_scrapers.blocking import add_blocking_arguments, apply_blocking, blocking_from_args, blocking_options, network_stats
+from social_scrapers.browser import ScrollWaiter, collect_new_anchors, load_page, quit_driver
+from social_scrapers.common import with_clients
+from social_scrapers.ingest import Ingestor
+from social_scrapers.metrics import add_metrics_arguments, metrics_from_args
+from social_scrapers.pacing import add_pacing_arguments, pacing_from_args, pacing_summary
+from social_scrapers.pipeline import iterate_in_thread, run_pipeline
+from social_scrapers.proxypool import add_proxy_pool_arguments, bind_proxy, lease_proxy, proxy_pool_from_args
+from social_scrapers.state import add_state_arguments, state_from_args
 
 
 def make_driver(headless: bool = True, proxy_server: Optional[str] = None) -> Chrome:
@@ -25,10 +32,13 @@ def make_driver(headless: bool = True, proxy_server: Optional[str] = None) -> Ch
     options.add_argument("--disable-gpu")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
+    # The logged-in session keeps one address, even across browsers
+    proxy_server = proxy_server or lease_proxy("instagram")
     if proxy_server:
         options.add_argument(f"--proxy-server={proxy_server}")
     driver_path = os.environ.get("CHROMEDRIVER", "/usr/bin/chromedriver")
-    return Chrome(service=Service(driver_path), options=options)
+    blocking_options(options)
+    return bind_proxy(apply_blocking(Chrome(service=Service(driver_path), options=options)), proxy_server)
 
 
 def parse_cookie_header(cookie_header: str):
@@ -43,15 +53,15 @@ def parse_cookie_header(cookie_header: str):
     return cookies
 
 
-def scroll_dialog(driver: Chrome, limit: int) -> List[str]:
+def iter_scroll_dialog(driver: Chrome, limit: int) -> Iterator[str]:
     seen = set()
-    out: List[str] = []
-    stagnant = 0
-    last = 0
-    while len(out) < limit and stagnant < 10:
-        anchors = driver.find_elements(By.CSS_SELECTOR, "a[href^='https://www.instagram.com/'], a[href^='/']")
+    count = 0
+    # The list scrolls inside the dialog, so growth is measured there
+    waiter = ScrollWaiter(driver, "a[href^='https://www.instagram.com/'], a[href^='/']", root="div[role=dialog]")
+    while count < limit and not waiter.done:
+        anchors = collect_new_anchors(driver, "a[href^='https://www.instagram.com/'], a[href^='/']")
         for a in anchors:
-            href = a.get_attribute("href") or ""
+            href = a["href"]
             if not href:
                 continue
             # profile links look like https://www.instagram.com/<username>/
@@ -61,51 +71,58 @@ def scroll_dialog(driver: Chrome, limit: int) -> List[str]:
                     continue
                 seen.add(key)
                 handle = key.rstrip("/").rsplit("/", 1)[-1]
-                out.append(handle)
-                if len(out) >= limit:
+                yield handle
+                count += 1
+                if count >= limit:
                     break
-        driver.execute_script("document.querySelector('div[role=dialog]')?.scrollBy(0, 1200)")
-        import time
-        time.sleep(random.uniform(0.9, 1.7))
-        if len(out) == last:
-            stagnant += 1
-        else:
-            stagnant = 0
-            last = len(out)
-    return out[:limit]
+        if count < limit:
+            waiter.scroll("document.querySelector('div[role=dialog]')?.scrollBy(0, 1200)")
 
 
-def collect_follow_list(seed_user: str, which: str, limit: int, headless: bool, proxy_server: Optional[str], cookie_header: str) -> List[dict]:
+def scroll_dialog(driver: Chrome, limit: int) -> List[str]:
+    return list(iter_scroll_dialog(driver, limit))
+
+
+def iter_follow_list(seed_user: str, which: str, limit: int, headless: bool, proxy_server: Optional[str], cookie_header: str) -> Iterator[dict]:
     # which: 'followers' or 'following'
     driver = make_driver(headless=headless, proxy_server=proxy_server)
     try:
-        driver.get("https://www.instagram.com")
+        load_page(driver, "https://www.instagram.com")
         for c in parse_cookie_header(cookie_header):
             try:
                 driver.add_cookie(c)
             except Exception:
                 pass
-        driver.get(f"https://www.instagram.com/{seed_user}/")
+        load_page(driver, f"https://www.instagram.com/{seed_user}/")
         try:
             WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "header")))
         except Exception:
             pass
         # Navigate to followers/following page which opens a dialog
-        driver.get(f"https://www.instagram.com/{seed_user}/{which}/")
+        load_page(driver, f"https://www.instagram.com/{seed_user}/{which}/")
         try:
             WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "div[role=dialog]")))
         except Exception:
             pass
-        handles = scroll_dialog(driver, limit)
-        return [{
-            "provider": "instagram",
-            "providerUserId": h,
-            "displayName": h,
-            "handle": h,
-            "profile_url": f"https://www.instagram.com/{h}/",
-        } for h in handles]
+        for h in iter_scroll_dialog(driver, limit):
+            yield {
+                "provider": "instagram",
+                "providerUserId": h,
+                "displayName": h,
+                "handle": h,
+                "profile_url": f"https://www.instagram.com/{h}/",
+            }
     finally:
-        driver.quit()
+        quit_driver(driver)
+
+
+def collect_follow_list(seed_user: str, which: str, limit: int, headless: bool, proxy_server: Optional[str], cookie_header: str) -> List[dict]:
+    return list(iter_follow_list(seed_user, which, limit, headless, proxy_server, cookie_header))
+
+
+def iter_follow_lists(seed_user: str, which_list: List[str], limit: int, headless: bool, proxy_server: Optional[str], cookie_header: str) -> Iterator[dict]:
+    for w in which_list:
+        yield from iter_follow_list(seed_user, w, limit, headless, proxy_server, cookie_header)
 
 
 async def main():
@@ -120,7 +137,16 @@ async def main():
     ap.add_argument("--emit-jsonl", type=str)
     ap.add_argument("--backend", type=str)
     ap.add_argument("--ingest", action="store_true")
+    add_state_arguments(ap)
+    add_blocking_arguments(ap)
+    add_pacing_arguments(ap)
+    add_proxy_pool_arguments(ap)
+    add_metrics_arguments(ap)
     args = ap.parse_args()
+    blocking = blocking_from_args(args, "instagram")
+    pacing = pacing_from_args(args)
+    proxy_pool = proxy_pool_from_args(args)
+    metrics_from_args(args, "instagram")
 
     which_list = []
     if args.followers:
@@ -130,23 +156,31 @@ async def main():
     if not which_list:
         which_list = ["followers"]
 
-    results: List[dict] = []
-    for w in which_list:
-        results += collect_follow_list(args.seed_user, w, args.limit, headless=not args.headful,
-                                       proxy_server=args.proxy_server, cookie_header=args.cookie)
+    # Stream handles straight to JSONL/ingest as the dialog scrolls
+    source = iterate_in_thread(iter_follow_lists, args.seed_user, which_list, args.limit, headless=not args.headful,
+                               proxy_server=args.proxy_server, cookie_header=args.cookie)
+    ingestor = Ingestor(args.backend, "instagram") if args.backend and args.ingest else None
+    state = state_from_args(args, "instagram")
+    result = await run_pipeline(source, jsonl_path=args.emit_jsonl, ingestor=ingestor, state=state)
 
     if args.emit_jsonl:
-        write_jsonl(args.emit_jsonl, results)
-        print(f"Wrote {len(results)} users to {args.emit_jsonl}")
+        print(f"Wrote {result.count} users to {args.emit_jsonl}")
 
-    if args.backend and args.ingest and results:
-        await ingest_candidates(args.backend, results, provider="instagram")
-        print(f"Ingest requested for {len(results)} users at {args.backend}")
+    if ingestor:
+        print(f"Ingest requested for {len(result.ingest.succeeded)} users at {args.backend} ({result.ingest.summary()})")
 
-    print(f"Discovered {len(results)} Instagram users")
-    if results:
-        print(f"Example: {results[0].get('displayName')} -> {results[0].get('profile_url')}")
+    print(f"Discovered {result.count} Instagram users")
+    if state is not None:
+        print(f"Skipped {result.known} profiles already processed in the last {args.refresh_days:g} days")
+    if blocking.enabled:
+        print(f"Network: {network_stats().summary()}")
+    if pacing:
+        print(f"Pacing: {pacing_summary()}")
+    if proxy_pool is not None:
+        print(f"Proxies: {proxy_pool.summary()}")
+    if result.first:
+        print(f"Example: {result.first.get('displayName')} -> {result.first.get('profile_url')}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(with_clients(main()))
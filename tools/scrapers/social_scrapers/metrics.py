@@ -0,0 +1,216 @@
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# Upper bounds (seconds) of latency histograms
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Upper bounds of count histograms (e.g. new results per scroll tick)
+COUNT_BUCKETS: Tuple[float, ...] = (0, 1, 2, 5, 10, 20, 50, 100)
+PREFIX = "scraper_"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        # One slot per bucket plus +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Iterator[Tuple[str, int]]:
+        total = 0
+        for bound, n in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += n
+            yield ("+Inf" if bound == float("inf") else f"{bound:g}"), total
+
+
+class Metrics:
+    """Counters and histograms keyed by name and labels, safe to update from any thread.
+
+    An update is a dict lookup under one lock, cheap enough for per-request and
+    per-scroll-tick call sites. const_labels (e.g. the job) are added to every
+    series on output. write() emits Prometheus text for .prom/.txt paths and a JSON
+    snapshot otherwise, replacing the file atomically.
+    """
+
+    def __init__(self, const_labels: Optional[Dict[str, str]] = None):
+        self.const_labels = dict(const_labels or {})
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(buckets)
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started, **labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {name: [{"labels": dict(k), "value": v} for k, v in series.items()]
+                        for name, series in self._counters.items()}
+            histograms = {name: [{"labels": dict(k), "count": h.count, "sum": round(h.sum, 6),
+                                  "buckets": dict(h.cumulative())} for k, h in series.items()]
+                          for name, series in self._histograms.items()}
+        return {"time": time.time(), "labels": self.const_labels, "counters": counters, "histograms": histograms}
+
+    def prometheus(self) -> str:
+        def fmt(labels: Dict[str, str]) -> str:
+            merged = {**self.const_labels, **labels}
+            if not merged:
+                return ""
+            escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                       for k, v in sorted(merged.items()))
+            return "{" + ",".join(escaped) + "}"
+
+        snap = self.snapshot()
+        lines = []
+        for name, series in sorted(snap["counters"].items()):
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            lines += [f"{PREFIX}{name}{fmt(s['labels'])} {s['value']:g}" for s in series]
+        for name, series in sorted(snap["histograms"].items()):
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for s in series:
+                for le, n in s["buckets"].items():
+                    lines.append(f"{PREFIX}{name}_bucket{fmt({**s['labels'], 'le': le})} {n}")
+                lines.append(f"{PREFIX}{name}_sum{fmt(s['labels'])} {s['sum']:g}")
+                lines.append(f"{PREFIX}{name}_count{fmt(s['labels'])} {s['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        body = self.prometheus() if path.endswith((".prom", ".txt")) else json.dumps(self.snapshot(), indent=1)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def inc(name: str, value: float = 1.0, **labels):
+    _metrics.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels):
+    _metrics.observe(name, value, buckets, **labels)
+
+
+def timer(name: str, **labels):
+    return _metrics.timer(name, **labels)
+
+
+def endpoint_for(url: str) -> str:
+    # Low-cardinality endpoint label: Last.fm's ?method=, the Data API resource, else the first path segment
+    parts = urlsplit(url)
+    method = parse_qs(parts.query).get("method")
+    if method:
+        return method[0]
+    segments = [p for p in parts.path.split("/") if p]
+    if not segments:
+        return "/"
+    if (parts.hostname or "").endswith("googleapis.com"):
+        return segments[-1]
+    return segments[0] if not segments[0].startswith("@") else "@"
+
+
+async def on_http_request(request):
+    # httpx event hook, registered after pacing so the time waited for a slot is not counted as latency
+    request.extensions["metrics_started"] = time.monotonic()
+
+
+async def on_http_response(response):
+    # httpx event hook: time to response headers by host, endpoint and status class
+    request = response.request
+    started = request.extensions.get("metrics_started")
+    if started is None:
+        return
+    url = str(request.url)
+    observe("http_request_seconds", time.monotonic() - started, host=urlsplit(url).hostname or "",
+            endpoint=endpoint_for(url), status=f"{response.status_code // 100}xx")
+
+
+class MetricsReporter:
+    # Rewrites the metrics file every `interval` seconds (if set) and once more on close
+    def __init__(self, path: str, interval: Optional[float] = None):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        if interval:
+            self._thread = threading.Thread(target=self._run, name="metrics", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                _metrics.write(self.path)
+            except OSError:
+                pass
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        _metrics.write(self.path)
+
+
+def add_metrics_arguments(ap: argparse.ArgumentParser):
+    ap.add_argument("--metrics-out", type=str, default=os.environ.get("SCRAPER_METRICS_OUT"),
+                    help="Write counters/histograms at exit: Prometheus text for .prom/.txt, JSON otherwise")
+    ap.add_argument("--metrics-interval", type=float, help="Also rewrite --metrics-out every N seconds")
+
+
+def metrics_from_args(args: argparse.Namespace, job: str) -> Optional[MetricsReporter]:
+    # Every series is labelled with the job; the file is written on exit however main() ends
+    _metrics.const_labels["job"] = job
+    if not args.metrics_out:
+        return None
+    reporter = MetricsReporter(args.metrics_out, args.metrics_interval)
+    atexit.register(reporter.close)
+    print(f"Metrics: writing to {args.metrics_out}", file=sys.stderr)
+    return reporter
@@ -0,0 +1,194 @@
+import argparse
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from social_scrapers.proxypool import BAN_STATUSES, record_proxy
+from social_scrapers.ratelimit import AdaptiveLimiter, retry_after_seconds
+
+# Scraped sites by host suffix; APIs with their own budgets (YouTube Data API quota,
+# Last.fm's published 5 req/s bucket) and the ingest backend are not paced here
+SITES: Dict[str, str] = {
+    "last.fm": "lastfm",
+    "spotify.com": "spotify",
+    "youtube.com": "youtube",
+    "tiktok.com": "tiktok",
+    "instagram.com": "instagram",
+    "facebook.com": "facebook",
+}
+# (starting, maximum) requests per second; page loads, scroll ticks and HTTP fetches all count
+SITE_RATES: Dict[str, Tuple[float, float]] = {
+    "lastfm": (2.0, 10.0),
+    "spotify": (1.0, 6.0),
+    "youtube": (1.0, 6.0),
+    "tiktok": (0.5, 4.0),
+    "instagram": (0.3, 2.0),
+    "facebook": (0.3, 2.0),
+}
+DEFAULT_SITE_RATE = (1.0, 4.0)
+
+# Characters of a page body handed to detectors
+SIGNAL_TEXT_CHARS = 20000
+
+
+@dataclass
+class PageSignal:
+    # What a detector sees of one response or loaded page; status is None for Selenium loads
+    url: str
+    text: str = ""
+    status: Optional[int] = None
+
+
+# A detector returns a block reason ("rate_limited", "challenge", "login_wall", ...) or None
+Detector = Callable[[PageSignal], Optional[str]]
+
+
+def _status_detector(signal: PageSignal) -> Optional[str]:
+    if signal.status == 429:
+        return "rate_limited"
+    if signal.status in (403, 503):
+        return f"http_{signal.status}"
+    return None
+
+
+def _markers(reason: str, url_parts: Tuple[str, ...] = (), text_parts: Tuple[str, ...] = ()) -> Detector:
+    # Detector matching URL fragments or (case-insensitive) page text
+    def detect(signal: PageSignal) -> Optional[str]:
+        if any(p in signal.url for p in url_parts):
+            return reason
+        text = signal.text.lower()
+        if text and any(p in text for p in text_parts):
+            return reason
+        return None
+    return detect
+
+
+DETECTORS: Dict[str, List[Detector]] = {
+    "*": [_status_detector],
+    "tiktok": [
+        _markers("challenge", text_parts=("verify to continue", "drag the slider", "secsdk-captcha", "captcha-verify")),
+        _markers("login_wall", url_parts=("tiktok.com/login",)),
+    ],
+    "instagram": [
+        _markers("login_wall", url_parts=("/accounts/login",)),
+        _markers("challenge", url_parts=("/challenge/",)),
+        _markers("rate_limited", text_parts=("please wait a few minutes before you try again",)),
+    ],
+    "facebook": [
+        _markers("challenge", url_parts=("/checkpoint/",)),
+        _markers("login_wall", url_parts=("facebook.com/login",)),
+        _markers("rate_limited", text_parts=("you're temporarily blocked", "you’re temporarily blocked")),
+    ],
+    "youtube": [
+        _markers("challenge", url_parts=("google.com/sorry",), text_parts=("unusual traffic from your computer network",)),
+    ],
+    "spotify": [
+        _markers("login_wall", url_parts=("accounts.spotify.com/",)),
+    ],
+    "lastfm": [],
+}
+
+
+def register_detector(site: str, detector: Detector):
+    # Extra block detector for a site ("*" for every site)
+    DETECTORS.setdefault(site, []).append(detector)
+
+
+def detect_block(site: str, signal: PageSignal) -> Optional[str]:
+    for detector in DETECTORS.get("*", []) + DETECTORS.get(site, []):
+        reason = detector(signal)
+        if reason:
+            return reason
+    return None
+
+
+def site_for(url: str) -> Optional[str]:
+    host = (urlsplit(url).hostname or "").lower()
+    for suffix, site in SITES.items():
+        if host == suffix or host.endswith("." + suffix):
+            return site
+    return None
+
+
+_enabled = False
+_max_rate: Optional[float] = None
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_lock = threading.Lock()
+
+
+def configure_pacing(enabled: bool = True, max_rate: Optional[float] = None):
+    # Called once from main() before any request; limiters are created per site on first use
+    global _enabled, _max_rate
+    with _lock:
+        _enabled = enabled
+        _max_rate = max_rate
+        _limiters.clear()
+
+
+def get_limiter(url: str) -> Optional[AdaptiveLimiter]:
+    # None when pacing is off or the URL is not a scraped site
+    if not _enabled:
+        return None
+    site = site_for(url)
+    if site is None:
+        return None
+    with _lock:
+        limiter = _limiters.get(site)
+        if limiter is None:
+            start, ceiling = SITE_RATES.get(site, DEFAULT_SITE_RATE)
+            if _max_rate is not None:
+                ceiling = min(ceiling, _max_rate)
+            limiter = _limiters[site] = AdaptiveLimiter(site, rate=min(start, ceiling), max_rate=ceiling)
+        return limiter
+
+
+def report(limiter: AdaptiveLimiter, signal: PageSignal, retry_after: Optional[float] = None) -> Optional[str]:
+    # Feeds one response into the limiter; returns the block reason when there was one
+    reason = detect_block(limiter.name, signal)
+    if reason:
+        limiter.blocked(reason, retry_after)
+    else:
+        limiter.success()
+    return reason
+
+
+async def on_request(request):
+    # httpx event hook: wait for the site's next slot
+    limiter = get_limiter(str(request.url))
+    if limiter is not None:
+        await limiter.acquire()
+
+
+async def on_response(response):
+    # httpx event hook: redirects are judged by where they end up, HTML bodies by their content
+    limiter = get_limiter(str(response.request.url))
+    if limiter is None or response.is_redirect:
+        return
+    text = ""
+    if response.status_code == 200 and "html" in response.headers.get("content-type", ""):
+        await response.aread()
+        text = response.content[:SIGNAL_TEXT_CHARS].decode("utf-8", "ignore")
+    reason = report(limiter, PageSignal(str(response.url), text, response.status_code),
+                    retry_after_seconds(response.headers.get("Retry-After")))
+    if reason and response.status_code not in BAN_STATUSES:
+        # A block page served with 200: the pool transport could not tell from the status alone
+        record_proxy(response.extensions.get("proxy_url"), banned=True)
+
+
+def pacing_summary() -> str:
+    with _lock:
+        return "; ".join(limiter.summary() for limiter in _limiters.values()) or "no paced requests"
+
+
+def add_pacing_arguments(ap: argparse.ArgumentParser):
+    ap.add_argument("--pace", type=str, choices=["adaptive", "off"],
+                    default=os.environ.get("SCRAPER_PACE", "adaptive"),
+                    help="Per-site request pacing: adaptive (AIMD on block signals) or off")
+    ap.add_argument("--max-rate", type=float, help="Upper bound on requests per second to any one site")
+
+
+def pacing_from_args(args: argparse.Namespace) -> bool:
+    configure_pacing(args.pace == "adaptive", args.max_rate)
+    return args.pace == "adaptive"
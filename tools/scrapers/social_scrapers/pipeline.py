@@ -0,0 +1,250 @@
+import asyncio
+import threading
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Iterator, List, Optional, Set
+
+from social_scrapers.common import JsonlWriter
+from social_scrapers.ingest import IngestReport, Ingestor, candidate_ref
+from social_scrapers.metrics import inc, timer
+from social_scrapers.seen import ExactSeen, SeenSet
+from social_scrapers.state import ProviderState, candidate_id
+
+_DONE = object()
+# Returned by an enrich callable to filter the item out of the rest of the pipeline
+DROP = object()
+# Returned by an enrich callable to pass the item on as-is without recording it as enriched
+SKIP = object()
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+async def iterate_in_thread(gen_fn: Callable[..., Iterator], *args, maxsize: int = 64,
+                            executor: Optional[Executor] = None, **kwargs) -> AsyncIterator:
+    """Drive a blocking generator (e.g. a Selenium scroll loop) in a worker thread.
+
+    Items cross into the event loop through a bounded queue, so a slow consumer
+    pauses the browser instead of buffering the whole list. The thread comes from
+    executor when given (a runner's browser pool), else the loop's default pool.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize)
+    stop = threading.Event()
+
+    def _put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def _produce():
+        gen = gen_fn(*args, **kwargs)
+        try:
+            for item in gen:
+                if stop.is_set():
+                    break
+                _put(item)
+        except BaseException as e:
+            _put(_Failure(e))
+        finally:
+            gen.close()
+            _put(_DONE)
+
+    producer = loop.run_in_executor(executor, _produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        # Keep draining so a producer blocked on a full queue can observe stop and exit
+        while not producer.done():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                await asyncio.sleep(0.05)
+
+
+@dataclass
+class PipelineResult:
+    count: int = 0
+    duplicates: int = 0
+    dropped: int = 0
+    known: int = 0
+    first: Any = None
+    ingest: Optional[IngestReport] = None
+    errors: List[str] = field(default_factory=list)
+
+
+async def run_pipeline(source: AsyncIterator, key: Optional[Callable[[Any], Hashable]] = None,
+                       enrich: Optional[Callable[[Any], Awaitable[Any]]] = None, enrich_concurrency: int = 5,
+                       jsonl_path: Optional[str] = None, ingestor: Optional[Ingestor] = None,
+                       limit: Optional[int] = None, maxsize: int = 256,
+                       state: Optional[ProviderState] = None, seen: Optional[SeenSet] = None,
+                       append: bool = False, writer: Optional[JsonlWriter] = None) -> PipelineResult:
+    """Stream candidates through dedupe -> enrich -> JSONL -> ingest.
+
+    Stages are joined by bounded queues, so scraping, enrichment and ingest overlap
+    and every record is on disk (and queued for ingest) as soon as it is enriched.
+    With a state store, enrich and ingest are skipped for profiles that went through
+    them within the refresh window; a profile with nothing left to do is dropped
+    and does not count towards limit. A writer passed in (output shared by several
+    pipelines) is written to but left open.
+    """
+    result = PipelineResult()
+    if ingestor is not None:
+        result.ingest = IngestReport()
+    enrich_workers = max(1, enrich_concurrency) if enrich else 0
+    ingest_workers = ingestor.max_concurrency if ingestor else 0
+    to_enrich: asyncio.Queue = asyncio.Queue(maxsize)
+    to_output: asyncio.Queue = asyncio.Queue(maxsize) if enrich else to_enrich
+    to_ingest: asyncio.Queue = asyncio.Queue(maxsize)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    source_error: List[BaseException] = []
+    # State keys whose enrichment / ingest is still fresh from an earlier run
+    skip_enrich: Set[str] = set()
+    skip_ingest: Set[str] = set()
+
+    def _admit_known(item) -> bool:
+        # Records the sighting; False when the profile needs neither stage this run
+        if state is None or not (enrich or ingestor):
+            return True
+        sk = candidate_id(item)
+        if sk is None:
+            return True
+        prior = state.seen(sk)
+        need_enrich = enrich is not None and state.stale(prior, "enriched")
+        need_ingest = ingestor is not None and state.stale(prior, "ingested")
+        if not need_enrich and not need_ingest:
+            result.known += 1
+            inc("pipeline_items_total", stage="known")
+            return False
+        if enrich is not None and not need_enrich:
+            skip_enrich.add(sk)
+        if ingestor is not None and not need_ingest:
+            skip_ingest.add(sk)
+        return True
+
+    dedupe = seen if seen is not None else ExactSeen()
+
+    async def _source():
+        admitted = 0
+        try:
+            async for item in source:
+                inc("pipeline_items_total", stage="collected")
+                k = key(item) if key else None
+                if k is not None and not dedupe.add(k):
+                    result.duplicates += 1
+                    inc("pipeline_items_total", stage="duplicate")
+                    continue
+                if not _admit_known(item):
+                    continue
+                await to_enrich.put(item)
+                admitted += 1
+                if limit is not None and admitted >= limit:
+                    break
+        except Exception as e:
+            # Let downstream stages flush what was already collected, then re-raise
+            source_error.append(e)
+        finally:
+            # Closing the source stops a threaded collector (and its browser) when the limit is hit
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            for _ in range(enrich_workers or 1):
+                await to_enrich.put(_DONE)
+
+    async def _enrich():
+        while True:
+            item = await to_enrich.get()
+            if item is _DONE:
+                return
+            sk = candidate_id(item) if state is not None else None
+            if sk is not None and sk in skip_enrich:
+                await to_output.put(item)
+                continue
+            try:
+                with timer("enrich_seconds"):
+                    enriched = await enrich(item)
+                if enriched is not SKIP:
+                    item = enriched or item
+                    if sk is not None and item is not DROP:
+                        state.mark([sk], "enriched")
+            except Exception as e:
+                result.errors.append(f"enrich: {e}")
+            if item is DROP:
+                result.dropped += 1
+                inc("pipeline_items_total", stage="dropped")
+                continue
+            await to_output.put(item)
+
+    async def _output(writer: Optional[JsonlWriter]):
+        while True:
+            item = await to_output.get()
+            if item is _DONE:
+                break
+            if writer is not None:
+                writer.write(item)
+            if result.first is None:
+                result.first = item
+            result.count += 1
+            inc("pipeline_items_total", stage="written")
+            if ingestor is not None and not (state is not None and candidate_id(item) in skip_ingest):
+                await to_ingest.put(item)
+        for _ in range(ingest_workers):
+            await to_ingest.put(_DONE)
+
+    async def _ingest():
+        batch_size = ingestor.batch_size
+        closed = False
+        while not closed:
+            item = await to_ingest.get()
+            if item is _DONE:
+                return
+            batch = [item]
+            while len(batch) < batch_size:
+                try:
+                    nxt = to_ingest.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if nxt is _DONE:
+                    closed = True
+                    break
+                batch.append(nxt)
+            results = await ingestor.send(batch)
+            result.ingest.results.extend(results)
+            if state is not None:
+                # send() answers in order for the items that have a ref
+                sent = [candidate_id(i) for i in batch if candidate_ref(i)]
+                state.mark([sk for sk, r in zip(sent, results) if r.ok], "ingested")
+
+    async def _enrich_done():
+        await asyncio.gather(*[_enrich() for _ in range(enrich_workers)])
+        await to_output.put(_DONE)
+
+    own_writer = writer is None and bool(jsonl_path)
+    if own_writer:
+        writer = JsonlWriter(jsonl_path, append=append)
+    stages = [_source(), _output(writer)]
+    if enrich:
+        stages.append(_enrich_done())
+    stages += [_ingest() for _ in range(ingest_workers)]
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        if own_writer:
+            writer.close()
+    if result.ingest is not None:
+        result.ingest.elapsed = loop.time() - started
+    if source_error:
+        raise source_error[0]
+    return result
@@ -0,0 +1,259 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+# Hosts whose traffic goes through the pool: scraped sites and their APIs, never the ingest backend
+PROXIED_HOSTS = ("last.fm", "audioscrobbler.com", "spotify.com", "youtube.com", "googleapis.com", "tiktok.com",
+                 "instagram.com", "facebook.com")
+# Latency assumed for a proxy that has not answered yet, so fresh proxies get tried early
+UNMEASURED_LATENCY = 0.5
+# Weight of the newest sample in the latency and error-rate moving averages
+EWMA_ALPHA = 0.2
+# Transport errors in a row that cool a proxy down like a ban
+ERROR_STREAK_LIMIT = 3
+# Statuses that mean this proxy's address is throttled or refused, not the request
+BAN_STATUSES = (403, 407, 429)
+# Keyed APIs answer 403/429 for the key (quotaExceeded, invalid key), whichever address sent it; their quota
+# and rate limiter handle those, so only a refused proxy login counts against the proxy
+API_HOSTS = ("googleapis.com", "audioscrobbler.com")
+API_BAN_STATUSES = (407,)
+
+
+def _matches(url: str, hosts) -> bool:
+    host = (urlsplit(url).hostname or "").lower()
+    return any(host == h or host.endswith("." + h) for h in hosts)
+
+
+def proxied(url: str) -> bool:
+    return _matches(url, PROXIED_HOSTS)
+
+
+def ban_status(url: str, status: int) -> bool:
+    # True when `status` from `url` says the proxy that carried the request is banned
+    return status in (API_BAN_STATUSES if _matches(url, API_HOSTS) else BAN_STATUSES)
+
+
+class ProxyHealth:
+    def __init__(self, url: str):
+        self.url = url
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.bans = 0
+        self.streak = 0
+        self.leases = 0
+        self.cooled_until = 0.0
+
+    def score(self) -> float:
+        # Lower is better: slow, failing and busy proxies all rank down
+        latency = self.latency if self.latency is not None else UNMEASURED_LATENCY
+        return latency * (1 + 4 * self.error_rate) * (1 + self.leases)
+
+
+class ProxyPool:
+    """Proxies ranked by latency, error rate and ban signals, handed out healthiest first.
+
+    acquire() returns the best proxy that is not cooling down; with a session key
+    it keeps returning the same proxy while that proxy stays usable, for cookie
+    sessions that must not change address. A ban (403/407/429 from a scraped site,
+    407 from a keyed API, or a block page) or ERROR_STREAK_LIMIT transport errors
+    in a row cool a proxy down for `cooldown` seconds, doubling with each further
+    ban up to `max_cooldown`. When every proxy
+    is cooling, the one that recovers first is used rather than stalling the run.
+    Safe to share between threads.
+    """
+
+    def __init__(self, urls: List[str], cooldown: float = 60.0, max_cooldown: float = 1800.0):
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._health: Dict[str, ProxyHealth] = {u: ProxyHealth(u) for u in dict.fromkeys(urls)}
+        self._sticky: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if not self._health:
+            raise ValueError("Proxy pool is empty")
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "ProxyPool":
+        # One proxy URL per line; blank lines and # comments are skipped, a bare host:port means http://
+        urls = []
+        with open(path) as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    urls.append(line if "://" in line else f"http://{line}")
+        return cls(urls, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._health)
+
+    def __contains__(self, url) -> bool:
+        return url in self._health
+
+    def _usable(self, h: ProxyHealth, now: float) -> bool:
+        return h.cooled_until <= now
+
+    def acquire(self, session: Optional[str] = None, lease: bool = False) -> str:
+        # lease=True counts the proxy as busy until release(); a browser holds one for its lifetime
+        with self._lock:
+            now = time.monotonic()
+            h = self._health.get(self._sticky.get(session)) if session else None
+            if h is None or not self._usable(h, now):
+                usable = [p for p in self._health.values() if self._usable(p, now)]
+                if usable:
+                    h = min(usable, key=ProxyHealth.score)
+                else:
+                    h = min(self._health.values(), key=lambda p: p.cooled_until)
+                if session:
+                    self._sticky[session] = h.url
+            if lease:
+                h.leases += 1
+            return h.url
+
+    def release(self, url: str):
+        with self._lock:
+            h = self._health.get(url)
+            if h is not None and h.leases > 0:
+                h.leases -= 1
+
+    def usable(self, url: str) -> bool:
+        with self._lock:
+            h = self._health.get(url)
+            return h is None or self._usable(h, time.monotonic())
+
+    def _cool(self, h: ProxyHealth, now: float):
+        h.cooled_until = now + min(self.max_cooldown, self.cooldown * 2 ** max(0, h.bans - 1))
+
+    def record(self, url: str, latency: Optional[float] = None, ok: bool = True, banned: bool = False):
+        with self._lock:
+            h = self._health.get(url)
+            if h is None:
+                return
+            now = time.monotonic()
+            h.requests += 1
+            failed = banned or not ok
+            h.error_rate += EWMA_ALPHA * ((1.0 if failed else 0.0) - h.error_rate)
+            if latency is not None and ok:
+                h.latency = latency if h.latency is None else h.latency + EWMA_ALPHA * (latency - h.latency)
+            if banned:
+                h.bans += 1
+                h.streak = 0
+                self._cool(h, now)
+            elif not ok:
+                h.errors += 1
+                h.streak += 1
+                if h.streak >= ERROR_STREAK_LIMIT:
+                    h.streak = 0
+                    self._cool(h, now)
+            else:
+                h.streak = 0
+
+    def summary(self) -> str:
+        with self._lock:
+            now = time.monotonic()
+            cooling = sum(1 for h in self._health.values() if not self._usable(h, now))
+            requests = sum(h.requests for h in self._health.values())
+            bans = sum(h.bans for h in self._health.values())
+            best = min(self._health.values(), key=ProxyHealth.score)
+        return (f"{len(self._health)} proxies, {cooling} cooling down; {requests} requests, {bans} bans; "
+                f"best {best.url.rsplit('@', 1)[-1]}")
+
+
+class PoolTransport(httpx.AsyncBaseTransport):
+    """httpx transport that sends each request through the pool's healthiest proxy.
+
+    Requests carrying a Cookie header stick to one proxy per host. Latency to
+    response headers, transport errors and ban statuses feed the proxy's health;
+    requests in flight count against a proxy's score like browser leases.
+    """
+
+    def __init__(self, pool: ProxyPool, **transport_kwargs):
+        self.pool = pool
+        self._kwargs = transport_kwargs
+        self._transports: Dict[str, httpx.AsyncHTTPTransport] = {}
+
+    def _transport(self, proxy: str) -> httpx.AsyncHTTPTransport:
+        transport = self._transports.get(proxy)
+        if transport is None:
+            transport = self._transports[proxy] = httpx.AsyncHTTPTransport(proxy=proxy, **self._kwargs)
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        session = request.url.host if "cookie" in request.headers else None
+        # Held until headers arrive, so concurrent requests spread across the pool
+        proxy = self.pool.acquire(session, lease=True)
+        started = time.monotonic()
+        try:
+            response = await self._transport(proxy).handle_async_request(request)
+        except httpx.TransportError:
+            self.pool.record(proxy, ok=False)
+            raise
+        finally:
+            self.pool.release(proxy)
+        self.pool.record(proxy, latency=time.monotonic() - started,
+                         banned=ban_status(str(request.url), response.status_code))
+        # Lets response hooks (block-page detection) charge a ban to the proxy that served it
+        response.extensions["proxy_url"] = proxy
+        return response
+
+    async def aclose(self):
+        for transport in self._transports.values():
+            await transport.aclose()
+
+
+_pool: Optional[ProxyPool] = None
+
+
+def configure_proxy_pool(path: Optional[str], cooldown: float = 60.0) -> Optional[ProxyPool]:
+    # Called once from main(); an explicit --proxy / --proxy-server still takes precedence at each call site
+    global _pool
+    _pool = ProxyPool.from_file(path, cooldown=cooldown) if path else None
+    return _pool
+
+
+def get_proxy_pool() -> Optional[ProxyPool]:
+    return _pool
+
+
+def lease_proxy(session: Optional[str] = None) -> Optional[str]:
+    # For a new browser: the healthiest proxy, held until release_proxy()
+    return _pool.acquire(session, lease=True) if _pool is not None else None
+
+
+def bind_proxy(driver, proxy: Optional[str]):
+    # Remember which pooled proxy a driver uses, for health reports and release on quit
+    if _pool is not None and proxy in _pool:
+        driver.proxy_url = proxy
+    return driver
+
+
+def release_proxy(driver):
+    proxy = getattr(driver, "proxy_url", None)
+    if _pool is not None and proxy:
+        _pool.release(proxy)
+        driver.proxy_url = None
+
+
+def record_proxy(proxy: Optional[str], latency: Optional[float] = None, ok: bool = True, banned: bool = False):
+    if _pool is not None and proxy:
+        _pool.record(proxy, latency=latency, ok=ok, banned=banned)
+
+
+def add_proxy_pool_arguments(ap: argparse.ArgumentParser):
+    ap.add_argument("--proxy-pool", type=str, default=os.environ.get("SCRAPER_PROXY_POOL"),
+                    help="File of proxy URLs, one per line, rotated by health (default SCRAPER_PROXY_POOL)")
+    ap.add_argument("--proxy-cooldown", type=float, default=60.0,
+                    help="Seconds a banned or failing proxy rests (doubles with each further ban)")
+
+
+def proxy_pool_from_args(args: argparse.Namespace) -> Optional[ProxyPool]:
+    pool = configure_proxy_pool(args.proxy_pool, cooldown=args.proxy_cooldown)
+    if pool is not None:
+        print(f"Proxy pool: {len(pool)} proxies from {args.proxy_pool}", file=sys.stderr)
+    return pool
@@ -0,0 +1,175 @@
+import atexit
+import datetime as dt
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+# YouTube Data API v3 units per request (https://developers.google.com/youtube/v3/determine_quota_cost)
+YT_COSTS: Dict[str, int] = {
+    "/search": 100,
+    "/channels": 1,
+    "/channelSections": 1,
+    "/playlistItems": 1,
+    "/playlists": 1,
+    "/videos": 1,
+    "/subscriptions": 1,
+}
+YT_DEFAULT_COST = 1
+YT_DAILY_UNITS = 10000
+DEFAULT_QUOTA_PATH = os.path.join(os.path.expanduser("~"), ".cache", "wreckshop-scrapers", "youtube-quota.json")
+
+
+class QuotaExhausted(Exception):
+    """No configured key has enough units left today for the next request."""
+
+
+def _quota_day() -> str:
+    # Quotas reset at midnight Pacific time
+    try:
+        from zoneinfo import ZoneInfo
+        now = dt.datetime.now(ZoneInfo("America/Los_Angeles"))
+    except Exception:
+        now = dt.datetime.utcnow() - dt.timedelta(hours=8)
+    return now.date().isoformat()
+
+
+def _fingerprint(key: str) -> str:
+    # Usage is persisted per key without writing the key itself to disk
+    return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+
+def yt_cost(path: str) -> int:
+    return YT_COSTS.get(path, YT_DEFAULT_COST)
+
+
+class QuotaManager:
+    """Tracks YouTube Data API units per key per quota day and rotates between keys.
+
+    Usage is persisted to a small JSON file, so consecutive runs on the same day
+    share one budget: at most every `save_interval` seconds while units are spent,
+    right away when a key is exhausted or the quota day rolls over, and on flush().
+    reserve() picks the key with the most units left and raises QuotaExhausted
+    when no key can afford the call.
+    """
+
+    def __init__(self, keys: List[str], daily_units: int = YT_DAILY_UNITS, path: Optional[str] = DEFAULT_QUOTA_PATH,
+                 save_interval: float = 5.0):
+        self.keys = list(dict.fromkeys(k for k in keys if k))
+        self.daily_units = daily_units
+        self.path = path
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._day = _quota_day()
+        self._used: Dict[str, int] = {}
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self.spent = 0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("day") == self._day:
+            self._used = {k: int(v) for k, v in state.get("used", {}).items()}
+
+    def _save(self):
+        if not self.path:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"day": self._day, "used": self._used}, f)
+        os.replace(tmp, self.path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def _maybe_save(self):
+        if self._dirty and time.monotonic() - self._saved_at >= self.save_interval:
+            self._save()
+
+    def _roll_day(self):
+        day = _quota_day()
+        if day != self._day:
+            self._day = day
+            self._used = {}
+            self._save()
+
+    def remaining(self, key: Optional[str] = None) -> int:
+        with self._lock:
+            self._roll_day()
+            keys = [key] if key else self.keys
+            return sum(max(0, self.daily_units - self._used.get(_fingerprint(k), 0)) for k in keys)
+
+    def reserve(self, path: str) -> str:
+        # Charge the call up front to the key with the most headroom and return that key
+        cost = yt_cost(path)
+        with self._lock:
+            self._roll_day()
+            best = None
+            best_left = -1
+            for k in self.keys:
+                left = self.daily_units - self._used.get(_fingerprint(k), 0)
+                if left >= cost and left > best_left:
+                    best, best_left = k, left
+            if best is None:
+                raise QuotaExhausted(f"{path} needs {cost} units; no YouTube API key has that many left today")
+            fp = _fingerprint(best)
+            self._used[fp] = self._used.get(fp, 0) + cost
+            self.spent += cost
+            self._dirty = True
+            self._maybe_save()
+            return best
+
+    def exhaust(self, key: str):
+        # The API reported quotaExceeded for this key (e.g. used elsewhere); stop choosing it today
+        with self._lock:
+            self._used[_fingerprint(key)] = self.daily_units
+            self._save()
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def summary(self) -> str:
+        return f"{self.spent} units spent this run, {self.remaining()} left today across {len(self.keys)} key(s)"
+
+
+def estimate_search_units(limit: int) -> int:
+    # One /search page (100) plus one /channels hydrate (1) per 50 channels
+    pages = max(1, math.ceil(limit / 50))
+    return pages * (yt_cost("/search") + yt_cost("/channels"))
+
+
+def estimate_crawl_units(limit: int, resolve_handle: bool = False) -> Dict[str, int]:
+    # Featured crawl: /channels batches are certain; channelSections are only spent when branding
+    # links run dry, so the upper bound assumes one per discovered channel
+    hydrate = max(1, math.ceil(limit / 50)) * yt_cost("/channels")
+    resolve = yt_cost("/channels") if resolve_handle else 0
+    return {"min": hydrate + resolve, "max": hydrate + resolve + limit * yt_cost("/channelSections")}
+
+
+_quota: Optional[QuotaManager] = None
+
+
+def configure_quota(keys: List[str], daily_units: int = YT_DAILY_UNITS, path: Optional[str] = None) -> QuotaManager:
+    # Called once from main(); YOUTUBE_QUOTA_PATH overrides where usage is persisted, written last at exit
+    global _quota
+    _quota = QuotaManager(keys, daily_units=daily_units,
+                          path=path or os.environ.get("YOUTUBE_QUOTA_PATH") or DEFAULT_QUOTA_PATH)
+    atexit.register(_quota.flush)
+    return _quota
+
+
+def get_quota() -> Optional[QuotaManager]:
+    return _quota
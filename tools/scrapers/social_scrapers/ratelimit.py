@@ -0,0 +1,127 @@
+import asyncio
+import email.utils
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from social_scrapers.metrics import inc, observe
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    # Retry-After is either delta-seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts of up to `burst`.
+
+    Waiters are served in arrival order, so a published API limit (e.g. Last.fm's
+    5 req/s) holds no matter how many coroutines share the bucket.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def drain(self, seconds: float):
+        # Push the next grant out by `seconds` after the server says we went too fast
+        self._refill()
+        self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+class AdaptiveLimiter:
+    """AIMD pacing for one site: additive increase while healthy, multiplicative cut on a block.
+
+    Each healthy response adds `increase` req/s up to `max_rate`; a block signal
+    multiplies the rate by `decrease` (down to `min_rate`) and pauses the site for a
+    cooldown that doubles with consecutive blocks, or for the server's Retry-After.
+    Blocks landing inside one cooldown cut the rate once. Grants are slots on one
+    timeline behind a thread lock, so coroutines (httpx) and Selenium threads share it.
+    """
+
+    def __init__(self, name: str, rate: float = 1.0, min_rate: float = 0.05, max_rate: float = 8.0,
+                 increase: float = 0.1, decrease: float = 0.5, cooldown: float = 5.0, max_cooldown: float = 300.0):
+        self.name = name
+        self.min_rate = min_rate
+        self.max_rate = max(min_rate, max_rate)
+        self.rate = min(max(rate, min_rate), self.max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.ok = 0
+        self.blocks: Counter = Counter()
+        self._streak = 0
+        self._next = 0.0
+        self._cut_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        # Seconds until this caller's slot
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + 1.0 / self.rate
+        observe("pacing_wait_seconds", slot - now, site=self.name)
+        return slot - now
+
+    async def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def wait(self):
+        # Blocking form for Selenium worker threads
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def success(self):
+        with self._lock:
+            self.ok += 1
+            self._streak = 0
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def blocked(self, reason: str, retry_after: Optional[float] = None):
+        inc("blocks_total", site=self.name, reason=reason)
+        with self._lock:
+            self.blocks[reason] += 1
+            now = time.monotonic()
+            pause = retry_after if retry_after is not None else min(self.max_cooldown, self.cooldown * 2 ** self._streak)
+            self._streak += 1
+            self._next = max(self._next, now + pause)
+            if now >= self._cut_until:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._cut_until = now + pause
+
+    def summary(self) -> str:
+        blocks = ", ".join(f"{n} {reason}" for reason, n in self.blocks.most_common()) or "no blocks"
+        return f"{self.name} at {self.rate:.2f} req/s ({self.ok} ok, {blocks})"
@@ -0,0 +1,311 @@
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import threading
+from typing import Iterable, List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+
+class SeenSet:
+    """Interface for crawl dedupe sets: add() returns True only for keys not seen before."""
+
+    def add(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def __contains__(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def update(self, keys: Iterable[str]):
+        for key in keys:
+            self.add(key)
+
+    def close(self):
+        pass
+
+
+class ExactSeen(SeenSet):
+    # Plain Python set; exact, but ~100+ bytes per profile URL
+    def __init__(self):
+        self._items: Set[str] = set()
+
+    def add(self, key: str) -> bool:
+        if key in self._items:
+            return False
+        self._items.add(key)
+        return True
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+
+class DiskSeen(SeenSet):
+    """Exact seen-set in a SQLite file, the confirmation store behind a file-backed Bloom filter.
+
+    New keys are buffered and written `batch` at a time (and on flush/close), so
+    recording a key costs a set insert rather than a disk write; only lookups go
+    to disk. Several processes can share the file, but keys another process still
+    has buffered are not visible to the others until it flushes.
+    """
+
+    def __init__(self, path: str, batch: int = 1000):
+        self.path = path
+        self.batch = batch
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY) WITHOUT ROWID")
+
+    def _stored(self, key: str) -> bool:
+        return key in self._pending or self._db.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone() is not None
+
+    def _record(self, key: str):
+        self._pending.add(key)
+        if len(self._pending) >= self.batch:
+            self._write()
+
+    def _write(self):
+        if not self._pending:
+            return
+        self._db.execute("BEGIN")
+        self._db.executemany("INSERT OR IGNORE INTO seen (key) VALUES (?)", ((k,) for k in self._pending))
+        self._db.execute("COMMIT")
+        self._pending.clear()
+
+    def add(self, key: str) -> bool:
+        with self._lock:
+            if self._stored(key):
+                return False
+            self._record(key)
+            return True
+
+    def record(self, key: str):
+        # For keys already known to be new (the Bloom filter had never set their bits): no lookup
+        with self._lock:
+            self._record(key)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self._stored(key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._write()
+            return self._db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+            self._db.execute("DELETE FROM seen")
+
+    def flush(self):
+        with self._lock:
+            self._write()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._write()
+                self._db.close()
+                self._db = None
+
+
+_MAGIC = b"WSBF"
+_HEADER = struct.Struct("<4sIQIQ")  # magic, version, bits, hashes, count
+_HEADER_SIZE = 64
+
+
+def bloom_size(capacity: int, error_rate: float):
+    # Optimal bit count and hash count for `capacity` keys at the given false-positive rate
+    bits = max(64, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+    hashes = max(1, int(round(bits / capacity * math.log(2))))
+    return bits, hashes
+
+
+class BloomSeen(SeenSet):
+    """Bloom filter seen-set on a bytearray, or on a file-backed mmap when given a path.
+
+    About 1.8 bytes (14.4 bits) per key at a 0.1% false-positive rate (10M handles ~ 18 MB).
+    A file-backed filter persists between runs and can be opened by several worker
+    processes at once; writers serialize on an flock. With an `exact` store every
+    new key is recorded there too, and a key is only reported seen when the filter
+    and the store agree: the filter answers the common "never seen" case without
+    touching disk, the store turns its false positives back into new keys.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001, path: Optional[str] = None,
+                 exact: Optional[DiskSeen] = None):
+        self.path = path
+        self.exact = exact
+        self._lock = threading.Lock()
+        self._file = None
+        bits, hashes = bloom_size(capacity, error_rate)
+        if path is None:
+            self.bits, self.hashes, self._count = bits, hashes, 0
+            self._buf = bytearray((bits + 7) // 8)
+            self._offset = 0
+            return
+        exists = os.path.exists(path) and os.path.getsize(path) >= _HEADER_SIZE
+        self._file = open(path, "r+b" if exists else "w+b")
+        if exists:
+            magic, _, bits, hashes, _ = _HEADER.unpack(self._file.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not a seen-set file")
+        else:
+            self._file.write(_HEADER.pack(_MAGIC, 1, bits, hashes, 0).ljust(_HEADER_SIZE, b"\0"))
+            self._file.truncate(_HEADER_SIZE + (bits + 7) // 8)
+            self._file.flush()
+        self.bits, self.hashes = bits, hashes
+        self._buf = mmap.mmap(self._file.fileno(), 0)
+        self._offset = _HEADER_SIZE
+
+    def _positions(self, key: str):
+        # Kirsch-Mitzenmacher double hashing over one 128-bit digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        h2 |= 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def _test(self, positions) -> bool:
+        buf, off = self._buf, self._offset
+        return all(buf[off + (p >> 3)] & (1 << (p & 7)) for p in positions)
+
+    def _set(self, positions) -> bool:
+        buf, off = self._buf, self._offset
+        fresh = False
+        for p in positions:
+            i = off + (p >> 3)
+            bit = 1 << (p & 7)
+            if not buf[i] & bit:
+                buf[i] |= bit
+                fresh = True
+        return fresh
+
+    def __contains__(self, key: str) -> bool:
+        if not self._test(self._positions(key)):
+            return False
+        return key in self.exact if self.exact is not None else True
+
+    def add(self, key: str) -> bool:
+        positions = self._positions(key)
+        with self._lock:
+            if self._file is not None and fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            try:
+                fresh = self._set(positions)
+                if fresh:
+                    self._bump()
+            finally:
+                if self._file is not None and fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        if fresh:
+            if self.exact is not None:
+                self.exact.record(key)
+            return True
+        # Probable duplicate; the exact store has the final say when there is one
+        return self.exact is not None and self.exact.add(key)
+
+    def _bump(self):
+        if self._file is None:
+            self._count += 1
+            return
+        count = struct.unpack_from("<Q", self._buf, _HEADER.size - 8)[0] + 1
+        struct.pack_into("<Q", self._buf, _HEADER.size - 8, count)
+
+    def __len__(self) -> int:
+        # Distinct keys added (false positives at add time are not counted)
+        if self._file is None:
+            return self._count
+        return struct.unpack_from("<Q", self._buf, _HEADER.size - 8)[0]
+
+    def clear(self):
+        # Forget every key, for the filter file and its exact store alike
+        with self._lock:
+            if self._file is None:
+                self._buf[:] = bytes(len(self._buf))
+                self._count = 0
+            else:
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+                try:
+                    self._buf[self._offset:] = bytes(len(self._buf) - self._offset)
+                    struct.pack_into("<Q", self._buf, _HEADER.size - 8, 0)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        if self.exact is not None:
+            self.exact.clear()
+
+    def flush(self):
+        if self._file is not None:
+            self._buf.flush()
+        if self.exact is not None:
+            self.exact.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._buf.flush()
+            self._buf.close()
+            self._file.close()
+            self._file = None
+        if self.exact is not None:
+            self.exact.close()
+
+
+def snapshot_seen(seen: SeenSet) -> Optional[List[str]]:
+    # Exact sets are stored inline; a file-backed Bloom filter already persists itself
+    if isinstance(seen, ExactSeen):
+        return list(seen)
+    if isinstance(seen, BloomSeen):
+        seen.flush()
+    return None
+
+
+def restore_seen(seen: SeenSet, snapshot: Optional[Iterable[str]]) -> SeenSet:
+    if snapshot:
+        seen.update(snapshot)
+    return seen
+
+
+def add_seen_arguments(ap: argparse.ArgumentParser):
+    ap.add_argument("--seen-filter", type=str,
+                    help="Dedupe through a file-backed Bloom filter, confirmed against an exact key file (PATH.keys). "
+                         "Cleared at the start of a run unless resuming or --seen-keep")
+    ap.add_argument("--seen-keep", action="store_true",
+                    help="Keep the keys already in --seen-filter: skip every profile earlier runs, or other worker "
+                         "processes of this crawl, have seen")
+    ap.add_argument("--seen-capacity", type=int, default=10_000_000, help="Profiles the Bloom filter is sized for")
+    ap.add_argument("--seen-error-rate", type=float, default=0.001, help="Bloom filter false-positive rate")
+
+
+def seen_from_args(args: argparse.Namespace, resumed: bool = False) -> SeenSet:
+    # A filter left by an earlier run would hide every profile it saw (the seed of a crawl included),
+    # so it only carries over into a resumed crawl or with --seen-keep
+    if not args.seen_filter:
+        return ExactSeen()
+    seen = BloomSeen(args.seen_capacity, args.seen_error_rate, path=args.seen_filter,
+                     exact=DiskSeen(f"{args.seen_filter}.keys"))
+    if len(seen) and not (resumed or args.seen_keep):
+        print(f"Clearing {len(seen)} profiles from {args.seen_filter} left by an earlier run "
+              f"(pass --seen-keep to skip them instead)", file=sys.stderr)
+        seen.clear()
+    return seen
@@ -0,0 +1,139 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass, is_dataclass
+from typing import Iterable, List, Optional
+
+DEFAULT_STATE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "wreckshop-scrapers", "state.sqlite")
+DEFAULT_REFRESH_DAYS = 30.0
+
+_STAGES = ("enriched", "ingested")
+
+
+def candidate_id(item) -> Optional[str]:
+    # Stable per-provider identity for dict candidates and the Last.fm/Spotify Candidate dataclasses
+    if is_dataclass(item):
+        item = asdict(item)
+    if isinstance(item, dict):
+        value = item.get("providerUserId") or item.get("handle") or item.get("profile_url")
+        return str(value) if value else None
+    return str(item) if item else None
+
+
+@dataclass
+class ProfileState:
+    first_seen: float
+    last_seen: float
+    last_enriched: Optional[float] = None
+    last_ingested: Optional[float] = None
+
+
+class CrawlState:
+    """On-disk record of every (provider, providerUserId) the scrapers have handled.
+
+    One SQLite file in WAL mode, shared by all scrapers and safe for concurrent
+    runs. Timestamps are unix seconds.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS profiles ("
+            " provider TEXT NOT NULL, user_id TEXT NOT NULL, first_seen REAL NOT NULL, last_seen REAL NOT NULL,"
+            " last_enriched REAL, last_ingested REAL, PRIMARY KEY (provider, user_id)) WITHOUT ROWID"
+        )
+
+    def get(self, provider: str, user_id: str) -> Optional[ProfileState]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT first_seen, last_seen, last_enriched, last_ingested FROM profiles"
+                " WHERE provider = ? AND user_id = ?", (provider, user_id)).fetchone()
+        return ProfileState(*row) if row else None
+
+    def seen(self, provider: str, user_id: str) -> Optional[ProfileState]:
+        # Record a sighting and return what was known before it
+        prior = self.get(provider, user_id)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO profiles (provider, user_id, first_seen, last_seen) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (provider, user_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (provider, user_id, now, now))
+        return prior
+
+    def mark(self, provider: str, user_ids: Iterable[str], stage: str):
+        if stage not in _STAGES:
+            raise ValueError(f"unknown stage {stage!r}")
+        now = time.time()
+        rows = [(provider, uid, now, now, now) for uid in user_ids if uid]
+        if not rows:
+            return
+        with self._lock:
+            self._db.executemany(
+                f"INSERT INTO profiles (provider, user_id, first_seen, last_seen, last_{stage})"
+                " VALUES (?, ?, ?, ?, ?)"
+                f" ON CONFLICT (provider, user_id) DO UPDATE SET last_{stage} = excluded.last_{stage}",
+                rows)
+
+    def for_provider(self, provider: str, refresh_days: float = DEFAULT_REFRESH_DAYS) -> "ProviderState":
+        return ProviderState(self, provider, refresh_days)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class ProviderState:
+    """CrawlState bound to one provider, with the staleness rule the pipeline applies."""
+
+    def __init__(self, store: CrawlState, provider: str, refresh_days: float = DEFAULT_REFRESH_DAYS):
+        self.store = store
+        self.provider = provider
+        self.refresh_after = refresh_days * 86400
+
+    def seen(self, user_id: str) -> Optional[ProfileState]:
+        return self.store.seen(self.provider, user_id)
+
+    def stale(self, prior: Optional[ProfileState], stage: str) -> bool:
+        # True when the stage never ran for this profile or ran longer ago than the refresh window
+        last = getattr(prior, f"last_{stage}", None) if prior else None
+        return last is None or time.time() - last >= self.refresh_after
+
+    def mark(self, user_ids: Iterable[str], stage: str):
+        self.store.mark(self.provider, user_ids, stage)
+
+    def pending(self, items: Iterable, stage: str) -> List:
+        # Batch form for non-streaming scrapers: record sightings, keep items the stage should still run for
+        out = []
+        for item in items:
+            uid = candidate_id(item)
+            if uid is None or self.stale(self.seen(uid), stage):
+                out.append(item)
+        return out
+
+
+def add_state_arguments(ap: argparse.ArgumentParser):
+    ap.add_argument("--state-path", type=str, help="Crawl state database (default SCRAPER_STATE_PATH or ~/.cache)")
+    ap.add_argument("--refresh-days", type=float, default=DEFAULT_REFRESH_DAYS,
+                    help="Re-enrich/re-ingest profiles last processed more than this many days ago")
+    ap.add_argument("--no-state", action="store_true", help="Ignore the crawl state store and process every profile")
+
+
+def state_from_args(args: argparse.Namespace, provider: str) -> Optional[ProviderState]:
+    store = open_state(args.state_path, enabled=not args.no_state)
+    return store.for_provider(provider, args.refresh_days) if store else None
+
+
+def open_state(path: Optional[str] = None, enabled: bool = True) -> Optional[CrawlState]:
+    # SCRAPER_STATE_PATH overrides the default location
+    if not enabled:
+        return None
+    return CrawlState(path or os.environ.get("SCRAPER_STATE_PATH") or DEFAULT_STATE_PATH)
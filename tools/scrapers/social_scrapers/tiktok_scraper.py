@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 import argparse
 import asyncio
+import json
 import os
 import random
 import sys
-from typing import List, Optional
+import time
+from typing import Dict, Iterator, List, Optional
 
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver import Chrome
@@ -14,10 +16,25 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from social_scrapers.common import write_jsonl, ingest_candidates
+from social_scrapers.blocking import add_blocking_arguments, apply_blocking, blocking_from_args, blocking_options, network_stats
+from social_scrapers.browser import DriverPool, ProfileEnricher, ResponseCapture, ScrollWaiter, collect_new_anchors, load_page, quit_driver
+from social_scrapers.common import with_clients
+from social_scrapers.ingest import Ingestor
+from social_scrapers.metrics import add_metrics_arguments, metrics_from_args
+from social_scrapers.pacing import add_pacing_arguments, pacing_from_args, pacing_summary
+from social_scrapers.pipeline import iterate_in_thread, run_pipeline
+from social_scrapers.proxypool import add_proxy_pool_arguments, bind_proxy, lease_proxy, proxy_pool_from_args
+from social_scrapers.state import add_state_arguments, state_from_args
 
 
-def make_driver(headless: bool = True, proxy_server: Optional[str] = None) -> Chrome:
+# XHR the search page calls for each page of user results
+SEARCH_API_PATH = "/api/search/user/full/"
+# How long xhr capture waits for a first search API response before reading the page instead
+XHR_GRACE_TICKS = 2
+XHR_GRACE_SECONDS = 4.0
+
+
+def make_driver(headless: bool = True, proxy_server: Optional[str] = None, capture: bool = False) -> Chrome:
     options = Options()
     if headless:
         options.add_argument("--headless=new")
@@ -29,10 +46,12 @@ def make_driver(headless: bool = True, proxy_server: Optional[str] = None) -> Ch
     options.add_argument("--lang=en-US")
     ua = os.environ.get("SCRAPER_UA", "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
     options.add_argument(f"--user-agent={ua}")
+    proxy_server = proxy_server or lease_proxy()
     if proxy_server:
         options.add_argument(f"--proxy-server={proxy_server}")
     driver_path = os.environ.get("CHROMEDRIVER", "/usr/bin/chromedriver")
-    return Chrome(service=Service(driver_path), options=options)
+    blocking_options(options, performance_log=capture)
+    return bind_proxy(apply_blocking(Chrome(service=Service(driver_path), options=options)), proxy_server)
 
 
 def parse_cookie_header(cookie_header: str):
@@ -47,20 +66,85 @@ def parse_cookie_header(cookie_header: str):
     return cookies
 
 
-def search_users(query: str, max_users: int = 50, headless: bool = True, proxy_server: Optional[str] = None, cookie_header: Optional[str] = None) -> List[dict]:
+def parse_search_response(body: str) -> List[dict]:
+    # user_list entries of the search API, with the counts a profile page visit would add
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return []
+    users: List[dict] = []
+    for entry in data.get("user_list") or []:
+        info = entry.get("user_info") or {}
+        handle = info.get("unique_id")
+        if not handle:
+            continue
+        item = {
+            "provider": "tiktok",
+            "providerUserId": handle,
+            "displayName": info.get("nickname") or handle,
+            "handle": handle,
+            "profile_url": f"https://www.tiktok.com/@{handle}",
+        }
+        for key, field in (("follower_count", "followersText"), ("following_count", "followingText"),
+                           ("total_favorited", "likesText")):
+            if info.get(key) is not None:
+                item[field] = str(info[key])
+        if info.get("signature"):
+            item["description"] = info["signature"]
+        users.append(item)
+    return users
+
+
+def has_counts(item: dict) -> bool:
+    return "followersText" in item
+
+
+def _dom_users(driver: Chrome) -> Iterator[dict]:
+    # New anchors only, with the nearest container's first text line as a display-name fallback
+    anchors = collect_new_anchors(driver, "a[href^='/@'], a[href^='https://www.tiktok.com/@']", context=True)
+    for a in anchors:
+        href = a["href"]
+        if not href or "/video/" in href:
+            continue
+        # profile URLs look like https://www.tiktok.com/@username
+        handle = href.rstrip('/').split('/')[-1]
+        if not handle or handle == '@':
+            continue
+        # Fall back to the nearby label if anchor text is empty
+        display = a["text"] or a["context"] or handle
+        yield {
+            "provider": "tiktok",
+            "providerUserId": handle,
+            "displayName": display,
+            "handle": handle,
+            "profile_url": href,
+        }
+
+
+def iter_search_users(query: str, max_users: int = 50, headless: bool = True, proxy_server: Optional[str] = None,
+                      cookie_header: Optional[str] = None, capture: str = "xhr") -> Iterator[dict]:
+    """Scroll TikTok's user search and yield each user once.
+
+    capture="xhr" parses the search API responses the page fetches (handle,
+    nickname, counts and bio in one pass). When none has arrived after
+    XHR_GRACE_TICKS scroll ticks and XHR_GRACE_SECONDS, with none still loading,
+    or when the list ends without one, users are read from the rendered anchors
+    instead, as they always are with capture="dom".
+    """
     url = f"https://www.tiktok.com/search/user?q={query}&lang=en"
-    driver = make_driver(headless=headless, proxy_server=proxy_server)
+    driver = make_driver(headless=headless, proxy_server=proxy_server, capture=capture == "xhr")
     try:
+        responses = ResponseCapture(driver, SEARCH_API_PATH) if capture == "xhr" else None
         driver.set_page_load_timeout(45)
         # If cookies provided, set them first
-        driver.get("https://www.tiktok.com")
+        load_page(driver, "https://www.tiktok.com")
         if cookie_header:
             for c in parse_cookie_header(cookie_header):
                 try:
                     driver.add_cookie(c)
                 except Exception:
                     pass
-        driver.get(url)
+        load_page(driver, url)
         try:
             WebDriverWait(driver, 25).until(EC.presence_of_element_located((By.CSS_SELECTOR, "a[href^='/@']")))
         except Exception:
@@ -71,7 +155,6 @@ def search_users(query: str, max_users: int = 50, headless: bool = True, proxy_s
             for b in buttons:
                 try:
                     b.click()
-                    import time
                     time.sleep(random.uniform(0.6, 1.2))
                     break
                 except Exception:
@@ -79,90 +162,71 @@ def search_users(query: str, max_users: int = 50, headless: bool = True, proxy_s
         except Exception:
             pass
         seen = set()
-        results: List[dict] = []
-        last = 0
-        stagnant = 0
-        while len(results) < max_users and stagnant < 10:
-            anchors = driver.find_elements(By.CSS_SELECTOR, "a[href^='/@'], a[href^='https://www.tiktok.com/@']")
-            for a in anchors:
-                href = a.get_attribute("href") or ""
-                if not href or "/video/" in href:
-                    continue
-                # profile URLs look like https://www.tiktok.com/@username
-                if href in seen:
-                    continue
-                seen.add(href)
-                handle = href.rstrip('/').split('/')[-1]
-                if not handle or handle == '@':
+        found = 0
+        ticks = 0
+        started = time.monotonic()
+        waiter = ScrollWaiter(driver, "a[href^='/@'], a[href^='https://www.tiktok.com/@']")
+        while found < max_users:
+            if responses is not None:
+                batch = [u for _, body in responses.poll() for u in parse_search_response(body)]
+                # The first response may still be in flight right after the page load; give it a bounded wait
+                waited = ticks >= XHR_GRACE_TICKS and time.monotonic() - started >= XHR_GRACE_SECONDS
+                if not responses.captured and (waiter.done or (waited and not responses.pending)):
+                    print("No search API responses captured; reading users from the page instead", file=sys.stderr)
+                    responses = None
+                    batch = list(_dom_users(driver))
+            else:
+                batch = list(_dom_users(driver))
+            for item in batch:
+                if item["handle"] in seen:
                     continue
-                # Try to get display name from nearby label if anchor text is empty
-                display = a.text.strip()
-                if not display:
-                    try:
-                        parent = a.find_element(By.XPATH, "ancestor::div[1]")
-                        txt = parent.text.strip()
-                        if txt:
-                            display = txt.splitlines()[0]
-                    except Exception:
-                        pass
-                display = display or handle
-                results.append({
-                    "provider": "tiktok",
-                    "providerUserId": handle,
-                    "displayName": display,
-                    "handle": handle,
-                    "profile_url": href,
-                })
-                if len(results) >= max_users:
+                seen.add(item["handle"])
+                found += 1
+                yield item
+                if found >= max_users:
                     break
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            import time
-            time.sleep(random.uniform(0.9, 1.9))
-            if len(results) == last:
-                stagnant += 1
-            else:
-                stagnant = 0
-                last = len(results)
-        return results[:max_users]
+            if found >= max_users or waiter.done:
+                break
+            waiter.scroll()
+            ticks += 1
     finally:
-        driver.quit()
+        quit_driver(driver)
+
 
+def search_users(query: str, max_users: int = 50, headless: bool = True, proxy_server: Optional[str] = None, cookie_header: Optional[str] = None,
+                 capture: str = "xhr") -> List[dict]:
+    return list(iter_search_users(query, max_users, headless, proxy_server, cookie_header, capture=capture))
 
-def enrich_tiktok_details(items: List[dict], headless: bool, proxy_server: Optional[str], limit: int = 10) -> List[dict]:
-    driver = make_driver(headless=headless, proxy_server=proxy_server)
+
+def read_profile_counts(driver: Chrome, url: str) -> Dict[str, str]:
+    # Best-effort follower/following/like counts from a profile page; {} when the page fails
+    details: Dict[str, str] = {}
     try:
-        for it in items[:limit]:
-            url = it.get("profile_url")
-            if not url:
-                continue
+        driver.set_page_load_timeout(35)
+        load_page(driver, url)
+        try:
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "body")))
+        except Exception:
+            pass
+        # Extract counts from common data-e2e attributes
+        def txt(sel: str):
             try:
-                driver.set_page_load_timeout(35)
-                driver.get(url)
-                try:
-                    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "body")))
-                except Exception:
-                    pass
-                # Extract counts from common data-e2e attributes
-                def txt(sel: str):
-                    try:
-                        el = driver.find_element(By.CSS_SELECTOR, sel)
-                        return (el.text or "").strip()
-                    except Exception:
-                        return None
-                followers = txt('[data-e2e="followers-count"]') or txt('strong[data-e2e="followers-count"]')
-                following = txt('[data-e2e="following-count"]') or txt('strong[data-e2e="following-count"]')
-                likes = txt('[data-e2e="likes-count"]') or txt('strong[data-e2e="likes-count"]')
-                if followers:
-                    it['followersText'] = followers
-                if following:
-                    it['followingText'] = following
-                if likes:
-                    it['likesText'] = likes
+                el = driver.find_element(By.CSS_SELECTOR, sel)
+                return (el.text or "").strip()
             except Exception:
-                continue
-    finally:
-        driver.quit()
-    return items
+                return None
+        followers = txt('[data-e2e="followers-count"]') or txt('strong[data-e2e="followers-count"]')
+        following = txt('[data-e2e="following-count"]') or txt('strong[data-e2e="following-count"]')
+        likes = txt('[data-e2e="likes-count"]') or txt('strong[data-e2e="likes-count"]')
+        if followers:
+            details['followersText'] = followers
+        if following:
+            details['followingText'] = following
+        if likes:
+            details['likesText'] = likes
+    except Exception:
+        pass
+    return details
 
 
 async def main():
@@ -174,28 +238,62 @@ async def main():
     ap.add_argument("--ingest", action="store_true")
     ap.add_argument("--headful", action="store_true")
     ap.add_argument("--proxy-server", type=str)
+    ap.add_argument("--capture", choices=["xhr", "dom"], default="xhr",
+                    help="Read users from the search API responses (xhr) or the rendered page (dom)")
+    ap.add_argument("--enrich-limit", type=int, default=10, help="Profiles whose pages are visited for counts (-1 for all)")
+    ap.add_argument("--enrich-workers", type=int, default=2, help="Browsers visiting profile pages in parallel")
+    add_state_arguments(ap)
+    add_blocking_arguments(ap)
+    add_pacing_arguments(ap)
+    add_proxy_pool_arguments(ap)
+    add_metrics_arguments(ap)
     args = ap.parse_args()
+    blocking = blocking_from_args(args, "tiktok")
+    pacing = pacing_from_args(args)
+    proxy_pool = proxy_pool_from_args(args)
+    metrics_from_args(args, "tiktok")
 
     if not args.query:
         print("Provide --query", flush=True)
         return
 
-    results = search_users(args.query, max_users=args.max_users,
-                           headless=not args.headful, proxy_server=args.proxy_server, cookie_header=None)
+    headless = not args.headful
+    source = iterate_in_thread(iter_search_users, args.query, max_users=args.max_users, headless=headless,
+                               proxy_server=args.proxy_server, cookie_header=None, capture=args.capture)
+    # Profiles are enriched once, while the search still scrolls; JSONL, ingest and the summary share the records.
+    # Users captured from the search API already carry their counts and cost no page visit.
+    pool = DriverPool(lambda: make_driver(headless=headless, proxy_server=args.proxy_server),
+                      size=max(1, args.enrich_workers))
+    enricher = ProfileEnricher(pool, read_profile_counts, limit=None if args.enrich_limit < 0 else args.enrich_limit,
+                               complete=has_counts)
+    ingestor = Ingestor(args.backend, "tiktok") if args.backend and args.ingest else None
+    state = state_from_args(args, "tiktok")
+    try:
+        result = await run_pipeline(source, key=lambda c: c.get("providerUserId"),
+                                    enrich=enricher.enrich if args.enrich_limit else None,
+                                    enrich_concurrency=pool.size, jsonl_path=args.emit_jsonl, ingestor=ingestor,
+                                    state=state)
+    finally:
+        pool.close()
 
     if args.emit_jsonl:
-        write_jsonl(args.emit_jsonl, enrich_tiktok_details(list(results), headless=not args.headful, proxy_server=args.proxy_server, limit=min(10, len(results))))
-        print(f"Wrote {len(results)} users to {args.emit_jsonl}")
+        print(f"Wrote {result.count} users to {args.emit_jsonl}")
 
-    if args.backend and args.ingest and results:
-        await ingest_candidates(args.backend, results, provider="tiktok")
-        print(f"Ingest requested for {len(results)} users at {args.backend}")
+    if ingestor:
+        print(f"Ingest requested for {len(result.ingest.succeeded)} users at {args.backend} ({result.ingest.summary()})")
 
-    results = enrich_tiktok_details(list(results), headless=not args.headful, proxy_server=args.proxy_server, limit=min(10, len(results)))
-    print(f"Discovered {len(results)} TikTok users")
-    if results:
-        print(f"Example: {results[0].get('displayName')} -> {results[0].get('profile_url')}")
+    print(f"Discovered {result.count} TikTok users ({enricher.visited} profile pages visited)")
+    if state is not None:
+        print(f"Skipped {result.known} profiles already processed in the last {args.refresh_days:g} days")
+    if blocking.enabled:
+        print(f"Network: {network_stats().summary()}")
+    if pacing:
+        print(f"Pacing: {pacing_summary()}")
+    if proxy_pool is not None:
+        print(f"Proxies: {proxy_pool.summary()}")
+    if result.first:
+        print(f"Example: {result.first.get('displayName')} -> {result.first.get('profile_url')}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(with_clients(main()))
@@ -1,46 +1,102 @@
 #!/usr/bin/env python3
 import argparse
 import asyncio
+import heapq
 import os
 import sys
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
 
 import httpx
 
 # Ensure 'scripts' is on path so 'social_scrapers' package is importable when run directly
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from social_scrapers.common import build_proxies, write_jsonl, ingest_candidates
+from social_scrapers.cassette import add_cassette_arguments, cassette_from_args, get_cassette
+from social_scrapers.cache import ResponseCache, configure_cache, get_cache
+from social_scrapers.checkpoint import Checkpoint, add_checkpoint_arguments, checkpoint_from_args
+from social_scrapers.common import build_proxies, get_client, with_clients
+from social_scrapers.frontier import Frontier
+from social_scrapers.ingest import Ingestor
+from social_scrapers.metrics import add_metrics_arguments, inc, metrics_from_args
+from social_scrapers.pipeline import run_pipeline
+from social_scrapers.proxypool import add_proxy_pool_arguments, proxy_pool_from_args
+from social_scrapers.quota import (YT_DAILY_UNITS, QuotaExhausted, configure_quota, estimate_crawl_units,
+                                   estimate_search_units, get_quota)
+from social_scrapers.seen import SeenSet, add_seen_arguments, seen_from_args
+from social_scrapers.state import add_state_arguments, state_from_args
+
+
+YT_API_BASE = "https://www.googleapis.com/youtube/v3"
 
 
 async def yt_request(api_key: str, path: str, params: Dict[str, str], proxies=None) -> dict:
-    async with httpx.AsyncClient(timeout=25, proxies=proxies) as client:
-        u = httpx.URL("https://www.googleapis.com/youtube/v3" + path)
+    # Fresh cache entries skip the network; stale ones are revalidated with their ETag
+    cache = get_cache()
+    endpoint = "youtube:" + path
+    key, entry = cache.lookup(endpoint, params) if cache else (None, None)
+    if entry is not None and entry.fresh:
+        return entry.json()
+    client = get_client(YT_API_BASE, proxies)
+    u = httpx.URL(YT_API_BASE + path)
+    cassette = get_cassette()
+    # Replayed responses cost no units
+    quota = get_quota() if cassette is None or not cassette.replaying else None
+    while True:
+        # With a quota manager the call is charged to (and sent with) the key that has most units left
+        key_used = quota.reserve(path) if quota else api_key
         qp = dict(params)
-        qp["key"] = api_key
-        r = await client.get(u, params=qp)
-        r.raise_for_status()
-        return r.json()
+        qp["key"] = key_used
+        r = await client.get(u, params=qp, timeout=25, headers=ResponseCache.validators(entry))
+        if quota and _quota_exceeded(r):
+            quota.exhaust(key_used)
+            inc("retries_total", component="youtube_quota")
+            continue
+        break
+    if r.status_code == 304 and entry is not None:
+        cache.revalidated(key, endpoint)
+        return entry.json()
+    r.raise_for_status()
+    if cache:
+        cache.store_response(key, endpoint, r)
+    return r.json()
+
+
+def _quota_exceeded(r: httpx.Response) -> bool:
+    if r.status_code != 403:
+        return False
+    try:
+        errors = r.json().get("error", {}).get("errors", [])
+    except Exception:
+        return False
+    return any(e.get("reason") in ("quotaExceeded", "dailyLimitExceeded") for e in errors if isinstance(e, dict))
 
 
 async def resolve_channel_id_from_handle(api_key: str, handle: str, proxies=None) -> Optional[str]:
     # Handles are like @ChannelHandle
     if handle.startswith("@"): handle = handle[1:]
-    # Search for channel by handle
+    # channels?forHandle costs 1 unit against 100 for a search
+    data = await yt_request(api_key, "/channels", {"part": "id", "forHandle": "@" + handle}, proxies)
+    items = data.get("items", [])
+    if items and items[0].get("id"):
+        return items[0]["id"]
+    # Fall back to searching for the handle
     data = await yt_request(api_key, "/search", {"part": "snippet", "q": handle, "type": "channel", "maxResults": "1"}, proxies)
     items = data.get("items", [])
     if not items: return None
     return items[0].get("snippet", {}).get("channelId") or items[0].get("id", {}).get("channelId")
 
 
-async def get_channel_details(api_key: str, channel_id: str, proxies=None) -> dict:
-    data = await yt_request(api_key, "/channels", {"part": "snippet,statistics,brandingSettings", "id": channel_id}, proxies)
-    item = (data.get("items") or [None])[0] or {}
+# /channels accepts up to 50 comma-separated IDs per call at the same quota cost as one
+CHANNELS_BATCH_SIZE = 50
+CHANNEL_PARTS = "snippet,statistics,brandingSettings"
+
+
+def parse_channel_item(item: dict, channel_id: Optional[str] = None) -> dict:
     snippet = item.get("snippet", {})
     stats = item.get("statistics", {})
     branding = item.get("brandingSettings", {})
     featured_ids = branding.get("channel", {}).get("featuredChannelsUrls", []) or []
     return {
-        "channelId": channel_id,
+        "channelId": channel_id or item.get("id"),
         "title": snippet.get("title"),
         "description": snippet.get("description"),
         "thumbnails": snippet.get("thumbnails", {}),
@@ -50,6 +106,28 @@ async def get_channel_details(api_key: str, channel_id: str, proxies=None) -> di
     }
 
 
+async def get_channels_details(api_key: str, channel_ids: Iterable[str], proxies=None) -> Dict[str, dict]:
+    # Hydrate many channels with multi-ID /channels requests; unknown IDs are simply absent
+    ids = list(dict.fromkeys(i for i in channel_ids if i))
+    out: Dict[str, dict] = {}
+    for start in range(0, len(ids), CHANNELS_BATCH_SIZE):
+        chunk = ids[start:start + CHANNELS_BATCH_SIZE]
+        data = await yt_request(api_key, "/channels", {
+            "part": CHANNEL_PARTS,
+            "id": ",".join(chunk),
+            "maxResults": str(CHANNELS_BATCH_SIZE),
+        }, proxies)
+        for item in data.get("items", []):
+            if item.get("id"):
+                out[item["id"]] = parse_channel_item(item)
+    return out
+
+
+async def get_channel_details(api_key: str, channel_id: str, proxies=None) -> dict:
+    details = await get_channels_details(api_key, [channel_id], proxies)
+    return details.get(channel_id) or parse_channel_item({}, channel_id)
+
+
 async def get_channel_section_links(api_key: str, channel_id: str, proxies=None) -> List[str]:
     # Fetch channel sections for additional featured channels
     try:
@@ -61,6 +139,8 @@ async def get_channel_section_links(api_key: str, channel_id: str, proxies=None)
                 if ch not in out:
                     out.append(ch)
         return out
+    except QuotaExhausted:
+        raise
     except Exception:
         return []
 
@@ -80,42 +160,146 @@ def to_candidate(ch: dict) -> dict:
     }
 
 
-async def crawl_featured(api_key: str, seed_channel_id: str, limit: int, proxies=None) -> List[dict]:
-    seen = set()
-    queue: List[str] = [seed_channel_id]
-    out: List[dict] = []
-    while queue and len(out) < limit:
-        ch_id = queue.pop(0)
-        if ch_id in seen: continue
-        seen.add(ch_id)
-        details = await get_channel_details(api_key, ch_id, proxies)
-        out.append(to_candidate(details))
-        # Extend queue with featured channels
-        featured = details.get("featuredChannelIds", [])
-        # plus sections
-        more = await get_channel_section_links(api_key, ch_id, proxies)
-        for nxt in featured + more:
-            if nxt not in seen and nxt not in queue and len(out) + len(queue) < limit * 2:
-                queue.append(nxt)
-    return out[:limit]
+async def iter_crawl_featured(api_key: str, seed_channel_id: str, limit: int, proxies=None, concurrency: int = 8,
+                              max_depth: Optional[int] = None, per_depth_limit: Optional[int] = None,
+                              seen: Optional[SeenSet] = None,
+                              checkpoint: Optional[Checkpoint] = None) -> AsyncIterator[dict]:
+    """Breadth-first crawl over featured channels, yielding candidates as each batch is hydrated.
 
+    Scheduled for channels per quota unit: one /channels call (1 unit) hydrates up to
+    50 channels and their branding featured links for free, so the frontier is
+    drained that way first. channelSections (1 unit per channel) is only called
+    when the frontier cannot fill the remaining budget, biggest channels first.
 
-async def search_channels(api_key: str, query: str, limit: int, proxies=None) -> List[dict]:
-    results: List[dict] = []
-    page_token = None
-    while len(results) < limit:
+    With a checkpoint, the frontier (including batches still in flight), pending
+    section lookups and the emitted count are saved periodically and on exit, and
+    a saved crawl is picked up where it stopped.
+    """
+    frontier = Frontier(max_depth=max_depth, per_depth_limit=per_depth_limit, max_pending=limit * 2, index=seen)
+    # Channels whose sections have not been fetched yet: (-subscribers, order, channel id, depth)
+    deferred: List[Tuple[int, int, str, int]] = []
+    order = 0
+    sem = asyncio.Semaphore(max(1, concurrency))
+    emitted = 0
+    saved = checkpoint.get("youtube_crawl") if checkpoint else {}
+    if saved:
+        frontier.restore(saved["frontier"])
+        deferred = [tuple(d) for d in saved.get("deferred", [])]
+        heapq.heapify(deferred)
+        order = max((d[1] for d in deferred), default=-1) + 1
+        emitted = saved.get("emitted", 0)
+    else:
+        frontier.push(seed_channel_id, 0)
+
+    async def _hydrate(batch: List[Tuple[str, int]]):
+        async with sem:
+            hydrated = await get_channels_details(api_key, [ch_id for ch_id, _ in batch], proxies)
+        return "channels", [(hydrated.get(ch_id) or parse_channel_item({}, ch_id), depth) for ch_id, depth in batch]
+
+    async def _sections(ch_id: str, depth: int):
+        async with sem:
+            return "sections", (depth, await get_channel_section_links(api_key, ch_id, proxies))
+
+    pending: Set[asyncio.Task] = set()
+    # What each pending task took off the frontier / deferred heap, so a checkpoint can put it back
+    work: Dict[asyncio.Task, Tuple[str, list]] = {}
+    in_flight = 0
+
+    def _snapshot() -> dict:
+        nodes = [n for kind, w in work.values() if kind == "channels" for n in w]
+        sections = [list(w) for kind, w in work.values() if kind == "sections"]
+        return {"frontier": frontier.snapshot(nodes), "deferred": [list(d) for d in deferred] + sections,
+                "emitted": emitted}
+
+    try:
+        while emitted < limit:
+            if checkpoint:
+                checkpoint.maybe_save("youtube_crawl", _snapshot)
+            room = limit - emitted - in_flight
+            while frontier and room > 0 and len(pending) < max(1, concurrency):
+                batch = frontier.pop_batch(min(CHANNELS_BATCH_SIZE, room))
+                in_flight += len(batch)
+                room -= len(batch)
+                task = asyncio.create_task(_hydrate(batch))
+                work[task] = ("channels", batch)
+                pending.add(task)
+            while deferred and room > len(frontier) and len(pending) < max(1, concurrency):
+                entry = heapq.heappop(deferred)
+                task = asyncio.create_task(_sections(entry[2], entry[3]))
+                work[task] = ("sections", list(entry))
+                pending.add(task)
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                kind, payload = task.result()
+                del work[task]
+                if kind == "sections":
+                    depth, links = payload
+                    for nxt in links:
+                        frontier.push(nxt, depth + 1)
+                    continue
+                in_flight -= len(payload)
+                for details, depth in payload:
+                    for nxt in details.get("featuredChannelIds", []):
+                        frontier.push(nxt, depth + 1)
+                    if max_depth is None or depth < max_depth:
+                        heapq.heappush(deferred, (-(details.get("subscriberCount") or 0), order,
+                                                  details["channelId"], depth))
+                        order += 1
+                    if emitted < limit:
+                        emitted += 1
+                        yield to_candidate(details)
+    finally:
+        for task in pending:
+            task.cancel()
+        if checkpoint:
+            checkpoint.save("youtube_crawl", _snapshot())
+
+
+async def crawl_featured(api_key: str, seed_channel_id: str, limit: int, proxies=None, concurrency: int = 8,
+                         max_depth: Optional[int] = None, per_depth_limit: Optional[int] = None,
+                         seen: Optional[SeenSet] = None) -> List[dict]:
+    return [c async for c in iter_crawl_featured(api_key, seed_channel_id, limit, proxies, concurrency=concurrency,
+                                                 max_depth=max_depth, per_depth_limit=per_depth_limit, seen=seen)]
+
+
+async def iter_search_channels(api_key: str, query: str, limit: int, proxies=None,
+                               checkpoint: Optional[Checkpoint] = None) -> AsyncIterator[dict]:
+    # The checkpoint cursor is the pageToken of the next unread page, saved once a page is fully yielded
+    saved = checkpoint.get("youtube_search") if checkpoint else {}
+    emitted = saved.get("emitted", 0)
+    page_token = saved.get("page_token")
+    if saved and not page_token:
+        return
+    while emitted < limit:
         params = {"part": "snippet", "q": query, "type": "channel", "maxResults": "50"}
         if page_token: params["pageToken"] = page_token
-        data = await yt_request(api_key, "/search", params, proxies)
+        try:
+            data = await yt_request(api_key, "/search", params, proxies)
+        except QuotaExhausted as e:
+            # Stop at a page boundary; what was already yielded stays valid
+            print(f"Stopping search: {e}", file=sys.stderr)
+            break
+        page_ids: List[str] = []
         for item in data.get("items", []):
             ch_id = item.get("snippet", {}).get("channelId") or item.get("id", {}).get("channelId")
-            if ch_id:
-                details = await get_channel_details(api_key, ch_id, proxies)
-                results.append(to_candidate(details))
-                if len(results) >= limit: break
+            if ch_id and ch_id not in page_ids:
+                page_ids.append(ch_id)
+        page_ids = page_ids[:limit - emitted]
+        # One multi-ID /channels call hydrates the whole search page
+        hydrated = await get_channels_details(api_key, page_ids, proxies)
+        for ch_id in page_ids:
+            emitted += 1
+            yield to_candidate(hydrated.get(ch_id) or parse_channel_item({}, ch_id))
         page_token = data.get("nextPageToken")
+        if checkpoint:
+            checkpoint.save("youtube_search", {"emitted": emitted, "page_token": page_token})
         if not page_token: break
-    return results[:limit]
+
+
+async def search_channels(api_key: str, query: str, limit: int, proxies=None) -> List[dict]:
+    return [c async for c in iter_search_channels(api_key, query, limit, proxies)]
 
 
 async def main():
@@ -124,23 +308,66 @@ async def main():
     ap.add_argument("--seed-handle", type=str, help="YouTube handle like @SomeChannel")
     ap.add_argument("--query", type=str, help="Search query to discover channels")
     ap.add_argument("--max-users", type=int, default=50)
+    ap.add_argument("--concurrency", type=int, default=8, help="Parallel API requests during the featured-channel crawl")
+    ap.add_argument("--max-depth", type=int, help="Stop expanding featured channels beyond this many hops from the seed")
+    ap.add_argument("--per-depth-limit", type=int, help="Maximum channels admitted at each crawl depth")
     ap.add_argument("--emit-jsonl", type=str)
     ap.add_argument("--backend", type=str)
     ap.add_argument("--ingest", action="store_true")
     ap.add_argument("--proxy", type=str)
     ap.add_argument("--proxy-http", type=str)
     ap.add_argument("--proxy-https", type=str)
-    ap.add_argument("--api-key", type=str, help="YouTube Data API key (falls back to YOUTUBE_API_KEY env)")
+    ap.add_argument("--api-key", type=str,
+                    help="YouTube Data API key(s), comma-separated (falls back to YOUTUBE_API_KEYS / YOUTUBE_API_KEY env)")
+    ap.add_argument("--daily-units", type=int, default=YT_DAILY_UNITS, help="Daily quota per key")
+    ap.add_argument("--quota-path", type=str, help="Where daily unit usage is persisted (default YOUTUBE_QUOTA_PATH or ~/.cache)")
+    ap.add_argument("--dry-run", action="store_true", help="Print the estimated quota cost and remaining units, then exit")
+    ap.add_argument("--cache-path", type=str, help="Response cache file (default SCRAPER_CACHE_PATH or ~/.cache)")
+    ap.add_argument("--no-cache", action="store_true", help="Always call the API instead of the local response cache")
+    add_state_arguments(ap)
+    add_seen_arguments(ap)
+    add_checkpoint_arguments(ap)
+    add_proxy_pool_arguments(ap)
+    add_metrics_arguments(ap)
+    add_cassette_arguments(ap)
     args = ap.parse_args()
 
-    api_key = args.api_key or os.environ.get("YOUTUBE_API_KEY")
-    if not api_key:
+    raw_keys = args.api_key or os.environ.get("YOUTUBE_API_KEYS") or os.environ.get("YOUTUBE_API_KEY") or ""
+    keys = [k.strip() for k in raw_keys.split(",") if k.strip()]
+    if not keys:
         print("Missing YOUTUBE_API_KEY; provide --api-key or env", flush=True)
         return
+    api_key = keys[0]
+    quota = configure_quota(keys, daily_units=args.daily_units, path=args.quota_path)
+
+    # Estimate before spending anything
+    if args.seed_channel_id or args.seed_handle:
+        est = estimate_crawl_units(args.max_users, resolve_handle=not args.seed_channel_id)
+        est_text = f"{est['min']}-{est['max']} units"
+        needed = est["min"]
+    elif args.query:
+        needed = estimate_search_units(args.max_users)
+        est_text = f"~{needed} units"
+    else:
+        needed, est_text = 0, "0 units"
+    remaining = quota.remaining()
+    print(f"Estimated cost: {est_text}; {remaining} units left today across {len(quota.keys)} key(s)", flush=True)
+    if args.dry_run:
+        return
+    if needed > remaining:
+        print("Warning: estimate exceeds remaining quota; the run will stop early", file=sys.stderr)
 
     proxies = build_proxies(args.proxy, args.proxy_http, args.proxy_https)
+    proxy_pool = proxy_pool_from_args(args)
+    metrics_from_args(args, "youtube")
+    cassette = cassette_from_args(args)
+    cache = configure_cache(args.cache_path, enabled=not args.no_cache)
+    job = {"seed_channel_id": args.seed_channel_id, "seed_handle": args.seed_handle, "query": args.query,
+           "max_users": args.max_users, "max_depth": args.max_depth, "per_depth_limit": args.per_depth_limit}
+    checkpoint = checkpoint_from_args(args, "youtube", job)
+    # One seen-set per run: the crawl frontier's index, or the search pipeline's dedupe
+    seen = seen_from_args(args, resumed=bool(checkpoint.state))
 
-    candidates: List[dict] = []
     if args.seed_channel_id or args.seed_handle:
         ch_id = args.seed_channel_id
         if not ch_id and args.seed_handle:
@@ -148,25 +375,57 @@ async def main():
         if not ch_id:
             print("Unable to resolve channel id from handle", flush=True)
             return
-        candidates = await crawl_featured(api_key, ch_id, args.max_users, proxies)
+        source = iter_crawl_featured(api_key, ch_id, args.max_users, proxies, concurrency=args.concurrency,
+                                     max_depth=args.max_depth, per_depth_limit=args.per_depth_limit,
+                                     seen=seen, checkpoint=checkpoint)
     elif args.query:
-        candidates = await search_channels(api_key, args.query, args.max_users, proxies)
+        source = iter_search_channels(api_key, args.query, args.max_users, proxies, checkpoint=checkpoint)
     else:
         print("Provide --seed-channel-id/--seed-handle or --query", flush=True)
         return
 
+    # Channels flow to JSONL and ingest while the crawl is still running
+    ingestor = Ingestor(args.backend, "youtube") if args.backend and args.ingest else None
+    state = state_from_args(args, "youtube")
+    try:
+        # Search pages need the pipeline's dedupe; the featured crawl's frontier already admits each channel once
+        crawling = bool(args.seed_channel_id or args.seed_handle)
+        key = None if crawling else (lambda c: c.get("providerUserId"))
+        result = await run_pipeline(source, key=key, jsonl_path=args.emit_jsonl, ingestor=ingestor, state=state,
+                                    seen=None if crawling else seen, append=bool(checkpoint.state))
+    except QuotaExhausted as e:
+        # Output already written is kept; rerun tomorrow with --resume or add keys to continue
+        print(f"Quota exhausted: {e}", file=sys.stderr)
+        print(f"Quota: {quota.summary()}")
+        print(f"Checkpoint saved to {checkpoint.path}; rerun with --resume to continue", file=sys.stderr)
+        return
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        # Only an interrupted crawl has a position worth resuming; errors propagate without the hint
+        print(f"Interrupted; checkpoint saved to {checkpoint.path}. Rerun with --resume to continue", file=sys.stderr)
+        raise
+    finally:
+        seen.close()
+    checkpoint.clear()
+
     if args.emit_jsonl:
-        write_jsonl(args.emit_jsonl, candidates)
-        print(f"Wrote {len(candidates)} channels to {args.emit_jsonl}")
+        print(f"Wrote {result.count} channels to {args.emit_jsonl}")
 
-    if args.backend and args.ingest and candidates:
-        await ingest_candidates(args.backend, candidates, provider="youtube")
-        print(f"Ingest requested for {len(candidates)} users at {args.backend}")
+    if ingestor:
+        print(f"Ingest requested for {len(result.ingest.succeeded)} users at {args.backend} ({result.ingest.summary()})")
 
-    print(f"Discovered {len(candidates)} channels")
-    if candidates:
-        print(f"Example: {candidates[0].get('displayName')} -> {candidates[0].get('profile_url')}")
+    print(f"Discovered {result.count} channels")
+    if state is not None:
+        print(f"Skipped {result.known} profiles already processed in the last {args.refresh_days:g} days")
+    if cache:
+        print(f"API cache: {cache.summary()}")
+    print(f"Quota: {quota.summary()}")
+    if proxy_pool is not None:
+        print(f"Proxies: {proxy_pool.summary()}")
+    if cassette is not None:
+        print(f"Cassette: {cassette.summary()}")
+    if result.first:
+        print(f"Example: {result.first.get('displayName')} -> {result.first.get('profile_url')}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(with_clients(main()))
@@ -4,7 +4,7 @@ import asyncio
 import os
 import random
 import sys
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver import Chrome
@@ -14,7 +14,15 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from social_scrapers.common import write_jsonl, ingest_candidates
+from social_scrapers.blocking import add_blocking_arguments, apply_blocking, blocking_from_args, blocking_options, network_stats
+from social_scrapers.browser import DriverPool, ProfileEnricher, ScrollWaiter, collect_new_anchors, load_page, quit_driver
+from social_scrapers.common import with_clients
+from social_scrapers.ingest import Ingestor
+from social_scrapers.metrics import add_metrics_arguments, metrics_from_args
+from social_scrapers.pacing import add_pacing_arguments, pacing_from_args, pacing_summary
+from social_scrapers.pipeline import iterate_in_thread, run_pipeline
+from social_scrapers.proxypool import add_proxy_pool_arguments, bind_proxy, lease_proxy, proxy_pool_from_args
+from social_scrapers.state import add_state_arguments, state_from_args
 
 
 def make_driver(headless: bool = True, proxy_server: Optional[str] = None) -> Chrome:
@@ -30,10 +38,12 @@ def make_driver(headless: bool = True, proxy_server: Optional[str] = None) -> Ch
     # Set a desktop UA to reduce consent/anti-bot friction
     ua = os.environ.get("SCRAPER_UA", "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
     options.add_argument(f"--user-agent={ua}")
+    proxy_server = proxy_server or lease_proxy()
     if proxy_server:
         options.add_argument(f"--proxy-server={proxy_server}")
     driver_path = os.environ.get("CHROMEDRIVER", "/usr/bin/chromedriver")
-    return Chrome(service=Service(driver_path), options=options)
+    blocking_options(options)
+    return bind_proxy(apply_blocking(Chrome(service=Service(driver_path), options=options)), proxy_server)
 
 
 def sleep_rand(a=0.9, b=1.8):
@@ -65,31 +75,33 @@ def try_accept_consent(driver: Chrome):
         pass
 
 
-def scrape_search(query: str, max_users: int, headless: bool, proxy_server: Optional[str]) -> List[dict]:
+def iter_search(query: str, max_users: int, headless: bool, proxy_server: Optional[str]) -> Iterator[dict]:
     # Use channel-filtered search param sp=EgIQAg%3D%3D which corresponds to "Type: Channel"
     url = f"https://www.youtube.com/results?search_query={query.replace(' ', '+')}&sp=EgIQAg%253D%253D"
     driver = make_driver(headless=headless, proxy_server=proxy_server)
     try:
         driver.set_page_load_timeout(45)
-        driver.get(url)
+        load_page(driver, url)
         try:
             WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "ytd-search")))
         except Exception:
             pass
         try_accept_consent(driver)
         seen = set()
-        results: List[dict] = []
-        stagnant = 0
-        last = 0
-        while len(results) < max_users and stagnant < 10:
+        found = 0
+        # "No more results" renders as a message renderer at the bottom of the list
+        waiter = ScrollWaiter(driver, "a[href*='/channel/'], a[href^='https://www.youtube.com/@']",
+                              end_marker="ytd-search ytd-message-renderer")
+        used_renderers = False
+        while found < max_users and not waiter.done:
             # Prefer channel renderers (since sp filters to channels, this should be plentiful)
-            items = driver.find_elements(By.CSS_SELECTOR, "ytd-channel-renderer a[href*='/channel/'], ytd-channel-renderer a[href^='https://www.youtube.com/@']")
-            anchors = [it.get_attribute("href") or "" for it in items]
+            anchors = collect_new_anchors(driver, "ytd-channel-renderer a[href*='/channel/'], ytd-channel-renderer a[href^='https://www.youtube.com/@']")
+            used_renderers = used_renderers or bool(anchors)
             # Fallback: any channel links
-            if not anchors:
-                more = driver.find_elements(By.CSS_SELECTOR, "a[href*='/channel/'], a[href^='https://www.youtube.com/@']")
-                anchors = [a.get_attribute("href") or "" for a in more]
-            for href in anchors:
+            if not used_renderers:
+                anchors = collect_new_anchors(driver, "a[href*='/channel/'], a[href^='https://www.youtube.com/@']")
+            for a in anchors:
+                href = a["href"]
                 if not href:
                     continue
                 if "/channel/" in href or "/@" in href:
@@ -97,52 +109,45 @@ def scrape_search(query: str, max_users: int, headless: bool, proxy_server: Opti
                     if key in seen:
                         continue
                     seen.add(key)
-                    display = None
-                    try:
-                        el = driver.find_element(By.CSS_SELECTOR, f"a[href='{href}']")
-                        display = el.text.strip() or None
-                    except Exception:
-                        pass
-                    results.append({
+                    display = a["text"] or None
+                    found += 1
+                    yield {
                         "provider": "youtube",
                         "providerUserId": key.rsplit('/', 1)[-1],
                         "displayName": display or key.rsplit('/', 1)[-1],
                         "profile_url": key,
-                    })
-                    if len(results) >= max_users:
+                    }
+                    if found >= max_users:
                         break
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            sleep_rand()
-            if len(results) == last:
-                stagnant += 1
-            else:
-                stagnant = 0
-                last = len(results)
-        return results[:max_users]
+            if found < max_users:
+                waiter.scroll()
     finally:
-        driver.quit()
+        quit_driver(driver)
 
 
-def scrape_channel_related(seed: str, is_handle: bool, max_users: int, headless: bool, proxy_server: Optional[str]) -> List[dict]:
+def scrape_search(query: str, max_users: int, headless: bool, proxy_server: Optional[str]) -> List[dict]:
+    return list(iter_search(query, max_users, headless, proxy_server))
+
+
+def iter_channel_related(seed: str, is_handle: bool, max_users: int, headless: bool, proxy_server: Optional[str]) -> Iterator[dict]:
     base = f"https://www.youtube.com/{('@' + seed) if is_handle else ('channel/' + seed)}"
     url = base + "/channels"  # 'Channels' tab shows featured/related channels
     driver = make_driver(headless=headless, proxy_server=proxy_server)
     try:
         driver.set_page_load_timeout(45)
-        driver.get(url)
+        load_page(driver, url)
         try:
             WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "ytd-tabbed-page-header-renderer, ytd-browse")))
         except Exception:
             pass
         try_accept_consent(driver)
         seen = set()
-        results: List[dict] = []
-        stagnant = 0
-        last = 0
-        while len(results) < max_users and stagnant < 10:
-            anchors = driver.find_elements(By.CSS_SELECTOR, "a[href*='/channel/'], a[href^='https://www.youtube.com/@']")
+        found = 0
+        waiter = ScrollWaiter(driver, "a[href*='/channel/'], a[href^='https://www.youtube.com/@']")
+        while found < max_users and not waiter.done:
+            anchors = collect_new_anchors(driver, "a[href*='/channel/'], a[href^='https://www.youtube.com/@']")
             for a in anchors:
-                href = a.get_attribute("href") or ""
+                href = a["href"]
                 if not href:
                     continue
                 if "/channel/" in href or "/@" in href:
@@ -150,66 +155,56 @@ def scrape_channel_related(seed: str, is_handle: bool, max_users: int, headless:
                     if key in seen or key == base:
                         continue
                     seen.add(key)
-                    display = a.text.strip() or key.rsplit('/', 1)[-1]
-                    results.append({
+                    display = a["text"] or key.rsplit('/', 1)[-1]
+                    found += 1
+                    yield {
                         "provider": "youtube",
                         "providerUserId": key.rsplit('/', 1)[-1],
                         "displayName": display,
                         "profile_url": key,
-                    })
-                    if len(results) >= max_users:
+                    }
+                    if found >= max_users:
                         break
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            sleep_rand()
-            if len(results) == last:
-                stagnant += 1
-            else:
-                stagnant = 0
-                last = len(results)
-        return results[:max_users]
+            if found < max_users:
+                waiter.scroll()
     finally:
-        driver.quit()
+        quit_driver(driver)
 
 
-def enrich_channel_details(items: List[dict], headless: bool, proxy_server: Optional[str], limit: int = 10) -> List[dict]:
-    # Best-effort enrichment: subscriber count and description from channel page
-    driver = make_driver(headless=headless, proxy_server=proxy_server)
+def scrape_channel_related(seed: str, is_handle: bool, max_users: int, headless: bool, proxy_server: Optional[str]) -> List[dict]:
+    return list(iter_channel_related(seed, is_handle, max_users, headless, proxy_server))
+
+
+def read_channel_details(driver: Chrome, url: str) -> Dict[str, Any]:
+    # Best-effort subscriber count and description from a channel page; {} when the page fails
+    details: Dict[str, Any] = {}
     try:
-        for i, it in enumerate(items[:limit]):
-            url = it.get("profile_url")
-            if not url:
-                continue
-            try:
-                driver.set_page_load_timeout(35)
-                driver.get(url)
-                try_accept_consent(driver)
-                try:
-                    WebDriverWait(driver, 12).until(EC.presence_of_element_located((By.CSS_SELECTOR, "ytd-browse, ytd-app")))
-                except Exception:
-                    pass
-                # Subscriber count
-                subs = None
-                try:
-                    sub_el = driver.find_element(By.CSS_SELECTOR, "#subscriber-count, yt-formatted-string#subscriber-count")
-                    subs = (sub_el.text or "").strip()
-                except Exception:
-                    pass
-                # Meta description as quick bio
-                desc = None
-                try:
-                    meta = driver.find_element(By.CSS_SELECTOR, "meta[name='description']")
-                    desc = meta.get_attribute("content")
-                except Exception:
-                    pass
-                if subs:
-                    it["subscriberCountText"] = subs
-                if desc:
-                    it["description"] = desc
-            except Exception:
-                continue
-    finally:
-        driver.quit()
-    return items
+        driver.set_page_load_timeout(35)
+        load_page(driver, url)
+        try_accept_consent(driver)
+        try:
+            WebDriverWait(driver, 12).until(EC.presence_of_element_located((By.CSS_SELECTOR, "ytd-browse, ytd-app")))
+        except Exception:
+            pass
+        # Subscriber count
+        try:
+            sub_el = driver.find_element(By.CSS_SELECTOR, "#subscriber-count, yt-formatted-string#subscriber-count")
+            subs = (sub_el.text or "").strip()
+            if subs:
+                details["subscriberCountText"] = subs
+        except Exception:
+            pass
+        # Meta description as quick bio
+        try:
+            meta = driver.find_element(By.CSS_SELECTOR, "meta[name='description']")
+            desc = meta.get_attribute("content")
+            if desc:
+                details["description"] = desc
+        except Exception:
+            pass
+    except Exception:
+        pass
+    return details
 
 
 def parse_cookie_header(cookie_header: str):
@@ -236,7 +231,18 @@ async def main():
     ap.add_argument("--headful", action="store_true")
     ap.add_argument("--proxy-server", type=str)
     ap.add_argument("--cookie", type=str, help="Cookie header string for youtube.com to bypass consent/login gates")
+    ap.add_argument("--enrich-limit", type=int, default=10, help="Channels whose pages are visited for details (-1 for all)")
+    ap.add_argument("--enrich-workers", type=int, default=2, help="Browsers visiting channel pages in parallel")
+    add_state_arguments(ap)
+    add_blocking_arguments(ap)
+    add_pacing_arguments(ap)
+    add_proxy_pool_arguments(ap)
+    add_metrics_arguments(ap)
     args = ap.parse_args()
+    blocking = blocking_from_args(args, "youtube")
+    pacing = pacing_from_args(args)
+    proxy_pool = proxy_pool_from_args(args)
+    metrics_from_args(args, "youtube_web")
 
     if not args.query and not args.seed_handle and not args.seed_channel_id:
         print("Provide --query or --seed-handle/--seed-channel-id", flush=True)
@@ -247,37 +253,54 @@ async def main():
     if args.cookie:
         d = make_driver(headless=headless, proxy_server=args.proxy_server)
         try:
-            d.get("https://www.youtube.com")
+            load_page(d, "https://www.youtube.com")
             for c in parse_cookie_header(args.cookie):
                 try:
                     d.add_cookie(c)
                 except Exception:
                     pass
         finally:
-            d.quit()
+            quit_driver(d)
 
     if args.query:
-        results = scrape_search(args.query, args.max_users, headless, args.proxy_server)
+        source = iterate_in_thread(iter_search, args.query, args.max_users, headless, args.proxy_server)
     else:
         is_handle = bool(args.seed_handle)
         seed = args.seed_handle or args.seed_channel_id
-        results = scrape_channel_related(seed, is_handle, args.max_users, headless, args.proxy_server)
+        source = iterate_in_thread(iter_channel_related, seed, is_handle, args.max_users, headless, args.proxy_server)
+
+    # Channels are enriched once, while the listing still scrolls; JSONL, ingest and the summary share the records
+    pool = DriverPool(lambda: make_driver(headless=headless, proxy_server=args.proxy_server),
+                      size=max(1, args.enrich_workers))
+    enricher = ProfileEnricher(pool, read_channel_details, limit=None if args.enrich_limit < 0 else args.enrich_limit)
+    ingestor = Ingestor(args.backend, "youtube") if args.backend and args.ingest else None
+    state = state_from_args(args, "youtube")
+    try:
+        result = await run_pipeline(source, key=lambda c: c.get("providerUserId"),
+                                    enrich=enricher.enrich if args.enrich_limit else None,
+                                    enrich_concurrency=pool.size, jsonl_path=args.emit_jsonl, ingestor=ingestor,
+                                    state=state)
+    finally:
+        pool.close()
 
     if args.emit_jsonl:
-        # Enrich a subset before writing if we didn't ingest to backend
-        write_jsonl(args.emit_jsonl, enrich_channel_details(list(results), headless, args.proxy_server, limit=min(10, len(results))))
-        print(f"Wrote {len(results)} channels to {args.emit_jsonl}")
+        print(f"Wrote {result.count} channels to {args.emit_jsonl}")
 
-    if args.backend and args.ingest and results:
-        await ingest_candidates(args.backend, results, provider="youtube")
-        print(f"Ingest requested for {len(results)} users at {args.backend}")
+    if ingestor:
+        print(f"Ingest requested for {len(result.ingest.succeeded)} users at {args.backend} ({result.ingest.summary()})")
 
-    # Best-effort enrichment printed for visibility
-    results = enrich_channel_details(list(results), headless, args.proxy_server, limit=min(10, len(results)))
-    print(f"Discovered {len(results)} channels")
-    if results:
-        print(f"Example: {results[0].get('displayName')} -> {results[0].get('profile_url')}")
+    print(f"Discovered {result.count} channels ({enricher.visited} channel pages visited)")
+    if state is not None:
+        print(f"Skipped {result.known} profiles already processed in the last {args.refresh_days:g} days")
+    if blocking.enabled:
+        print(f"Network: {network_stats().summary()}")
+    if pacing:
+        print(f"Pacing: {pacing_summary()}")
+    if proxy_pool is not None:
+        print(f"Proxies: {proxy_pool.summary()}")
+    if result.first:
+        print(f"Example: {result.first.get('displayName')} -> {result.first.get('profile_url')}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(with_clients(main()))
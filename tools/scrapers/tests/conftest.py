@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The scrapers import each other as `social_scrapers.*` from tools/scrapers
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("selenium")  # the scrapers import their browser helpers even on HTTP-only runs
+
+from social_scrapers.bench import HTTP_SCENARIOS, run_scenario
+from social_scrapers.common import configure_origins, remap_url
+from social_scrapers.fixtures import FixtureConfig, FixtureServer
+
+# Extra flags keeping the smoke runs short: Last.fm enrichment is otherwise paced at 5 API calls/s
+EXTRA = {"lastfm": ["--enrich-rate", "1000"]}
+
+
+@pytest.fixture(scope="module")
+def server():
+    with FixtureServer(FixtureConfig(items=40, page_size=10, latency=0)) as s:
+        yield s
+
+
+@pytest.mark.parametrize("scenario", HTTP_SCENARIOS)
+def test_http_scenario_runs_offline(server, scenario):
+    result = run_scenario(scenario, server, max_users=15, timeout=120, extra=EXTRA.get(scenario))
+
+    assert result.ok, result.error
+    assert result.users == 15
+    assert result.ingested == 15
+    assert result.http_requests > 0
+
+
+def test_origins_remap_scraped_hosts_only():
+    configure_origins({"https://www.last.fm": "http://127.0.0.1:9001", "https://www.googleapis.com": "http://127.0.0.1:9002"})
+    try:
+        assert remap_url("https://www.last.fm/music/x/+listeners?page=2") == "http://127.0.0.1:9001/music/x/+listeners?page=2"
+        assert remap_url("https://www.googleapis.com/youtube/v3/channels?id=a") == "http://127.0.0.1:9002/youtube/v3/channels?id=a"
+        assert remap_url("http://backend:4002/api/profiles/ingest") == "http://backend:4002/api/profiles/ingest"
+    finally:
+        configure_origins(None)
@@ -0,0 +1,29 @@
+from social_scrapers.cache import ResponseCache
+
+
+def test_byte_total_tracks_stores_replacements_and_evictions(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=1000)
+    for i in range(8):
+        cache.store(f"k{i}", "lastfm:user.getinfo", b"x" * 100)
+    cache.store("k0", "lastfm:user.getinfo", b"x" * 10)
+    assert cache._bytes == cache._stored_bytes() == 710
+
+    for i in range(8, 12):
+        cache.store(f"k{i}", "lastfm:user.getinfo", b"x" * 100)
+    assert cache.stats["evicted"] > 0
+    assert cache._bytes == cache._stored_bytes() <= 1000
+    # A reopened cache starts from what is on disk
+    assert ResponseCache(cache.path, max_bytes=1000)._bytes == cache._bytes
+
+
+def test_revalidated_lookup_counts_once_as_a_hit(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttls={"youtube:/channels": -1})
+    key, entry = cache.lookup("youtube:/channels", {"id": "a"})
+    assert entry is None
+    cache.store(key, "youtube:/channels", b"{}", etag='"v1"')
+
+    key, entry = cache.lookup("youtube:/channels", {"id": "a"})
+    assert not entry.fresh
+    cache.revalidated(key, "youtube:/channels")
+
+    assert cache.summary() == "1 hits, 1 misses (50% served from cache)"
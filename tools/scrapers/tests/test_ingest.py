@@ -0,0 +1,190 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from social_scrapers import ingest
+from social_scrapers.ingest import Ingestor
+
+BACKEND = "http://backend.test"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Record backoff and Retry-After sleeps instead of waiting them out
+    recorded = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(seconds, *args, **kwargs):
+        recorded.append(seconds)
+        await real_sleep(0)
+
+    monkeypatch.setattr(ingest.asyncio, "sleep", fake_sleep)
+    return recorded
+
+
+def make_ingestor(handler, **kwargs) -> Ingestor:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return Ingestor(BACKEND, "lastfm", client=client, **kwargs)
+
+
+def ok(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    if "items" in body:
+        return httpx.Response(200, json={"ok": True, "results": [
+            {"ok": True, "jobId": f"job-{item['handleOrUrl']}"} for item in body["items"]]})
+    return httpx.Response(200, json={"ok": True, "jobId": f"job-{body['handleOrUrl']}"})
+
+
+def test_429_halves_concurrency_and_honours_retry_after(sleeps):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "7"})
+        return ok(request)
+
+    ingestor = make_ingestor(handler, concurrency=8)
+    result = asyncio.run(ingestor.send(["u1"]))
+
+    assert [r.ok for r in result] == [True]
+    assert len(calls) == 2
+    assert ingestor._limit == 4
+    # The retry waited out the pause Retry-After asked for
+    assert any(s == pytest.approx(7, abs=0.5) for s in sleeps)
+
+
+def test_clean_window_grows_concurrency_by_one(sleeps):
+    ingestor = make_ingestor(ok, concurrency=8)
+    ingestor._limit = 3
+
+    asyncio.run(ingestor.submit([f"u{i}" for i in range(2)]))
+    assert ingestor._limit == 3
+    asyncio.run(ingestor.submit(["u2"]))
+    assert ingestor._limit == 4
+    # Growth stops at the configured concurrency
+    asyncio.run(ingestor.submit([f"u{i}" for i in range(100)]))
+    assert ingestor._limit == 8
+
+
+@pytest.mark.parametrize("failure", ["503", "transport"])
+def test_5xx_and_transport_errors_are_retried(sleeps, failure):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 3:
+            if failure == "transport":
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(503)
+        return ok(request)
+
+    result = asyncio.run(make_ingestor(handler, max_retries=4).send(["u1"]))
+
+    assert len(calls) == 3
+    assert result[0].ok and result[0].status == 200 and result[0].job_id == "job-u1"
+    # Exponential backoff between attempts
+    assert sleeps[:2] == [pytest.approx(1.0, rel=0.25), pytest.approx(2.0, rel=0.25)]
+
+
+def test_retries_give_up_after_max_retries(sleeps):
+    def handler(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    result = asyncio.run(make_ingestor(handler, max_retries=2).send(["u1"]))
+
+    assert not result[0].ok and result[0].status is None
+    assert "refused" in result[0].error
+
+
+# What a backend without the batch form answers: the body is validated as one profile
+SINGLE_FORM_ERROR = {"ok": False, "error": {"formErrors": [], "fieldErrors": {
+    "provider": ["Required"], "handleOrUrl": ["Required"]}}}
+
+
+@pytest.mark.parametrize("status,error", [(400, SINGLE_FORM_ERROR), (404, {"error": "not found"}),
+                                          (405, {"error": "method"}), (413, {"error": "too large"})])
+def test_batch_rejection_falls_back_to_single_posts(sleeps, status, error):
+    bodies = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        bodies.append(body)
+        if "items" in body:
+            return httpx.Response(status, json=error)
+        return ok(request)
+
+    ingestor = make_ingestor(handler, batch_size=3)
+    report = asyncio.run(ingestor.submit(["u1", "u2", "u3", "u4", "u5"]))
+
+    assert ingestor.batch_size == 1
+    assert [r.handle_or_url for r in report.results] == ["u1", "u2", "u3", "u4", "u5"]
+    assert all(r.ok for r in report.results)
+    # Chunks already in flight try the batch form once each; every item still lands exactly once
+    assert sum("items" in b for b in bodies) <= 2
+    assert sorted(b["handleOrUrl"] for b in bodies if "items" not in b) == ["u1", "u2", "u3", "u4", "u5"]
+
+
+def test_invalid_item_retries_its_chunk_singly_and_keeps_batching(sleeps):
+    bodies = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        bodies.append(body)
+        items = body.get("items", [body])
+        if any(not item["handleOrUrl"].startswith("u") for item in items):
+            # The batch route rejects the whole body when one item fails validation
+            field = "items" if "items" in body else "handleOrUrl"
+            return httpx.Response(400, json={"ok": False, "error": {"formErrors": [],
+                                                                     "fieldErrors": {field: ["Invalid"]}}})
+        return ok(request)
+
+    ingestor = make_ingestor(handler, batch_size=3)
+    first = asyncio.run(ingestor.send(["u1", "bad", "u3"]))
+
+    assert ingestor.batch_size == 3
+    assert [(r.handle_or_url, r.ok, r.status) for r in first] == [("u1", True, 200), ("bad", False, 400),
+                                                                  ("u3", True, 200)]
+    # The next chunk still goes out as one batch
+    bodies.clear()
+    second = asyncio.run(ingestor.send(["u4", "u5", "u6"]))
+    assert all(r.ok for r in second)
+    assert len(bodies) == 1 and len(bodies[0]["items"]) == 3
+
+
+def test_batch_results_are_accounted_per_item(sleeps):
+    def handler(request):
+        body = json.loads(request.content)
+        return httpx.Response(200, json={"ok": True, "results": [
+            {"ok": True, "jobId": 1},
+            {"ok": False, "error": "unknown user"},
+            {"ok": True, "jobId": "j3"},
+        ][:len(body["items"])]})
+
+    report = asyncio.run(make_ingestor(handler, batch_size=3).submit([{"handle": "a"}, {"handle": "b"},
+                                                                        {"profile_url": "https://x/c"}]))
+
+    assert [(r.handle_or_url, r.ok, r.job_id, r.error) for r in report.results] == [
+        ("a", True, "1", None), ("b", False, None, "unknown user"), ("https://x/c", True, "j3", None)]
+    assert all(r.status == 200 for r in report.results)
+    assert (len(report.succeeded), len(report.failed)) == (2, 1)
+
+
+def test_unretryable_errors_fail_every_item_of_the_batch(sleeps):
+    def handler(request):
+        return httpx.Response(500, json={"error": "db down"})
+
+    report = asyncio.run(make_ingestor(handler, batch_size=2, max_retries=1).submit(["a", "b"]))
+
+    assert [(r.ok, r.status, r.error) for r in report.results] == [(False, 500, "db down"), (False, 500, "db down")]
+
+
+def test_single_post_reports_backend_rejection(sleeps):
+    def handler(request):
+        return httpx.Response(200, json={"ok": False, "error": "private profile"})
+
+    result = asyncio.run(make_ingestor(handler).send(["u1"]))
+
+    assert not result[0].ok and result[0].error == "private profile"
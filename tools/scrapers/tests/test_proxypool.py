@@ -0,0 +1,42 @@
+import asyncio
+
+import httpx
+
+from social_scrapers.proxypool import PoolTransport, ProxyPool
+
+PROXY = "http://proxy-1:8080"
+
+
+def send(status: int, url: str, body: dict = None) -> ProxyPool:
+    pool = ProxyPool([PROXY])
+    transport = PoolTransport(pool)
+    transport._transports[PROXY] = httpx.MockTransport(lambda request: httpx.Response(status, json=body or {}))
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get(url)
+
+    asyncio.run(run())
+    return pool
+
+
+def test_api_quota_403_does_not_cool_the_proxy():
+    quota = {"error": {"code": 403, "errors": [{"reason": "quotaExceeded"}]}}
+    pool = send(403, "https://www.googleapis.com/youtube/v3/channels?id=a", quota)
+
+    assert pool.usable(PROXY)
+    assert "0 bans" in pool.summary()
+
+
+def test_api_rate_limit_and_invalid_key_do_not_cool_the_proxy():
+    assert send(429, "https://www.googleapis.com/youtube/v3/search?q=x").usable(PROXY)
+    assert send(403, "https://ws.audioscrobbler.com/2.0/?method=user.getinfo").usable(PROXY)
+
+
+def test_api_proxy_auth_failure_still_cools_the_proxy():
+    assert not send(407, "https://www.googleapis.com/youtube/v3/channels?id=a").usable(PROXY)
+
+
+def test_scraped_site_403_and_429_cool_the_proxy():
+    assert not send(403, "https://www.tiktok.com/search/user?q=x").usable(PROXY)
+    assert not send(429, "https://www.last.fm/music/x/+listeners").usable(PROXY)
@@ -0,0 +1,39 @@
+import argparse
+
+import pytest
+
+from social_scrapers.seen import BloomSeen, DiskSeen, add_seen_arguments, seen_from_args
+
+
+def test_false_positive_is_confirmed_against_the_exact_store(tmp_path):
+    # Sized for 10 keys at 50% error, so most of 2000 keys collide in the filter
+    path = str(tmp_path / "seen.bloom")
+    seen = BloomSeen(10, 0.5, path=path, exact=DiskSeen(f"{path}.keys"))
+    keys = [f"https://www.last.fm/user/u{i}" for i in range(2000)]
+    assert all(seen.add(k) for k in keys)
+    assert not any(seen.add(k) for k in keys)
+    assert "https://www.last.fm/user/never-added" not in seen
+    seen.close()
+
+
+def _args(path, *extra):
+    ap = argparse.ArgumentParser()
+    add_seen_arguments(ap)
+    return ap.parse_args(["--seen-filter", path, *extra])
+
+
+@pytest.mark.parametrize("extra, resumed, kept", [
+    ((), False, False),
+    ((), True, True),
+    (("--seen-keep",), False, True),
+])
+def test_filter_from_an_earlier_run_is_cleared_unless_resumed_or_kept(tmp_path, extra, resumed, kept):
+    path = str(tmp_path / "seen.bloom")
+    earlier = seen_from_args(_args(path))
+    earlier.add("https://www.last.fm/user/seed")
+    earlier.close()
+
+    seen = seen_from_args(_args(path, *extra), resumed=resumed)
+    assert len(seen) == (1 if kept else 0)
+    assert seen.add("https://www.last.fm/user/seed") is not kept
+    seen.close()